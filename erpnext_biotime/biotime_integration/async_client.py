@@ -0,0 +1,190 @@
+import asyncio
+import json
+import math
+
+import frappe
+import httpx
+from frappe.utils import cint
+from frappe.utils.password import set_encrypted_password
+
+from erpnext_biotime.biotime_integration.page_cache import store_page
+from erpnext_biotime.biotime_integration.progress import check_cancelled
+from erpnext_biotime.biotime_integration.rate_limiter import REQUEST_TIMEOUT, async_biotime_request, get_limits
+
+logger = frappe.logger("biotime", allow_site=True, file_count=50)
+
+TRANSACTION_FILTERS = ("start_time", "end_time", "emp_code", "terminal_sn", "terminal_alias")
+DEFAULT_PAGE_SIZE = 1000
+
+
+def get_connector(connector_name=None):
+    """Get a BioTime Connector, falling back to the first enabled one."""
+    if not connector_name:
+        connector_name = frappe.db.get_value("BioTime Connector", filters={"is_enabled": 1}, fieldname="name")
+    if not connector_name:
+        raise Exception("No enabled BioTime Connector found")
+
+    return frappe.get_doc("BioTime Connector", connector_name)
+
+
+class AsyncBioTimeClient:
+    """
+    asyncio client for one BioTime Connector.
+
+    Pages and devices are fetched concurrently on a single event loop, bounded
+    by the connector's max in-flight requests and shared rate limit:
+
+        async with AsyncBioTimeClient(connector) as client:
+            terminals = await client.list_terminals()
+
+    Use the module level sync wrappers from scheduler jobs and whitelisted methods.
+    An optional `progress` (SyncProgress) is updated per page and checked for
+    cancellation before every request.
+    """
+
+    def __init__(self, connector, progress=None):
+        self.connector = connector
+        self.progress = progress
+        self.token = connector.get_password("access_token", raise_exception=False)
+        self.semaphore = asyncio.Semaphore(get_limits(connector)[1])
+        self.token_lock = asyncio.Lock()
+        self.client = None
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(base_url=self.connector.company_portal, timeout=REQUEST_TIMEOUT)
+        if not self.token:
+            await self.fetch_token()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
+
+    async def fetch_token(self) -> str:
+        password = self.connector.get_password("password", raise_exception=False)
+        if not password:
+            raise Exception("No password found for BioTime Connector")
+
+        response = await async_biotime_request(
+            self.client,
+            self.connector,
+            "POST",
+            "/jwt-api-token-auth/",
+            json={"username": self.connector.username, "password": password},
+        )
+        if response.status_code != 200:
+            logger.error("Failed to refresh token. Status code: %d, Response: %s", response.status_code, response.text)
+            raise Exception(f"Failed to refresh token: {response.status_code}")
+
+        self.token = response.json()["token"]
+        set_encrypted_password("BioTime Connector", self.connector.name, self.token, "access_token")
+        frappe.db.commit()
+        logger.info("Successfully refreshed token for connector: %s", self.connector.name)
+        return self.token
+
+    async def get(self, path, params=None, raw=False) -> dict | bytes:
+        """
+        GET a JSON resource, refreshing the token once if it has expired.
+        With `raw`, the undecoded body is returned so it can be parsed later.
+        """
+        for attempt in range(2):
+            check_cancelled(self.progress)
+            token = self.token
+            async with self.semaphore:
+                response = await async_biotime_request(
+                    self.client, self.connector, "GET", path, params=params, headers={"Authorization": f"JWT {token}"}
+                )
+            if response.status_code == 401 and not attempt:
+                async with self.token_lock:
+                    # Concurrent requests share one refresh
+                    if self.token == token:
+                        await self.fetch_token()
+                continue
+
+            response.raise_for_status()
+            return response.content if raw else response.json()
+
+    async def get_all_pages(self, path, params=None, page_size=DEFAULT_PAGE_SIZE) -> list[bytes]:
+        """
+        Fetch the first page for the total count, then every remaining page concurrently.
+        Pages are returned as raw bodies, which are far smaller than their decoded rows.
+        """
+        params = dict(params or {}, page_size=page_size)
+        first_page = await self.get(path, dict(params, page=1), raw=True)
+        count = cint(json.loads(first_page).get("count"))
+        page_count = math.ceil(count / page_size)
+        if self.progress:
+            self.progress.set_total(rows=self.progress.total_rows + count, pages=self.progress.total_pages + page_count)
+            self.progress.add(rows=min(count, page_size), pages=1)
+
+        async def get_page(page):
+            content = await self.get(path, dict(params, page=page), raw=True)
+            if self.progress:
+                self.progress.add(rows=min(count - (page - 1) * page_size, page_size), pages=1)
+            return content
+
+        other_pages = await asyncio.gather(*(get_page(page) for page in range(2, page_count + 1)))
+        return [first_page, *other_pages]
+
+    async def get_all_rows(self, path, params=None, page_size=DEFAULT_PAGE_SIZE) -> list:
+        pages = await self.get_all_pages(path, params, page_size)
+        return [row for page in pages for row in json.loads(page)["data"]]
+
+    async def list_terminals(self) -> list:
+        return await self.get_all_rows("/iclock/api/terminals/")
+
+    async def get_terminal(self, device_id) -> dict:
+        return await self.get(f"/iclock/api/terminals/{device_id}/")
+
+    async def fetch_transaction_pages(self, page_size=DEFAULT_PAGE_SIZE, **filters) -> list[bytes]:
+        params = {k: v for k, v in filters.items() if k in TRANSACTION_FILTERS and v}
+        pages = await self.get_all_pages("/iclock/api/transactions/", params, page_size)
+        for page, content in enumerate(pages, start=1):
+            store_page(self.connector.name, dict(params, page_size=page_size), page, content)
+        return pages
+
+    async def fetch_transaction_pages_for_devices(self, terminal_aliases, **filters) -> list[bytes]:
+        results = await asyncio.gather(
+            *(self.fetch_transaction_pages(**dict(filters, terminal_alias=alias)) for alias in terminal_aliases)
+        )
+        return [page for pages in results for page in pages]
+
+    async def count_transactions(self, **filters) -> int:
+        """Total number of transactions matching the filters, read from a one row page."""
+        params = {k: v for k, v in filters.items() if k in TRANSACTION_FILTERS and v}
+        page = await self.get("/iclock/api/transactions/", dict(params, page=1, page_size=1))
+        return cint(page.get("count"))
+
+    async def fetch_transactions(self, page_size=DEFAULT_PAGE_SIZE, **filters) -> list:
+        params = {k: v for k, v in filters.items() if k in TRANSACTION_FILTERS and v}
+        return await self.get_all_rows("/iclock/api/transactions/", params, page_size)
+
+
+def run_with_client(connector, operation, progress=None):
+    """Run `operation(client)` to completion on a fresh event loop and return its result."""
+
+    async def runner():
+        async with AsyncBioTimeClient(connector, progress=progress) as client:
+            return await operation(client)
+
+    return asyncio.run(runner())
+
+
+def list_terminals(connector) -> list:
+    return run_with_client(connector, lambda client: client.list_terminals())
+
+
+def get_terminal(connector, device_id) -> dict:
+    return run_with_client(connector, lambda client: client.get_terminal(device_id))
+
+
+def fetch_transaction_pages(connector, terminal_aliases=None, progress=None, **filters) -> list[bytes]:
+    """
+    Fetch raw BioTime transaction pages, all pages (and devices) concurrently.
+    Accepts the same filters as the transactions API; parse the pages with
+    `transactions.split_transaction_pages`.
+    """
+    if terminal_aliases:
+        return run_with_client(
+            connector, lambda client: client.fetch_transaction_pages_for_devices(terminal_aliases, **filters), progress
+        )
+    return run_with_client(connector, lambda client: client.fetch_transaction_pages(**filters), progress)
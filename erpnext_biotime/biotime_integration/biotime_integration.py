@@ -2,9 +2,32 @@ import datetime
 import json
 import re
 from datetime import datetime, timedelta
+import time
+import zlib
+from itertools import groupby
 import frappe
+import httpx
 import requests
+from frappe.utils import cint, get_datetime
+from frappe.utils.background_jobs import is_job_queued
 from urllib.parse import urlparse, parse_qs
+from erpnext_biotime.biotime_integration.async_client import get_connector, get_terminal, list_terminals
+from erpnext_biotime.biotime_integration.cache import get_biotime_settings
+from erpnext_biotime.biotime_integration.page_cache import get_cached_pages, store_page
+from erpnext_biotime.biotime_integration.progress import check_cancelled
+from erpnext_biotime.biotime_integration.punch_summary import update_daily_punch_summary
+from erpnext_biotime.biotime_integration.replica import read_replica
+from erpnext_biotime.biotime_integration.shift_resolver import ShiftResolver
+from erpnext_biotime.biotime_integration.shift_resolver import is_enabled as batch_shift_resolution_enabled
+from erpnext_biotime.biotime_integration.rate_limiter import REQUEST_TIMEOUT, backoff_delay, biotime_request
+from erpnext_biotime.biotime_integration.transactions import (
+    BioTimeTransaction,
+    debounce_checkins,
+    get_employees_by_device_code,
+    split_transaction_pages,
+    split_transactions,
+)
+from erpnext_biotime.overrides.employee_checkin import run_with_attendance_lock
 
 logger = frappe.logger("biotime", allow_site=True, file_count=50)
 
@@ -15,15 +38,17 @@ def remove_non_numeric_chars(string):
     return result
 
 
-def get_connector_with_headers() -> tuple:
+def get_enabled_connectors() -> list:
+    """Names of all enabled BioTime Connectors, each synced as its own pipeline."""
+    return frappe.get_all("BioTime Connector", filters={"is_enabled": 1}, pluck="name", order_by="name")
+
+
+def get_connector_with_headers(connector_name=None) -> tuple:
     """
-    Get the enabled connector and its headers with improved error handling.
+    Get the connector and its headers with improved error handling.
+    Falls back to the first enabled connector when no name is given.
     """
-    enabled_connector = frappe.db.get_value("BioTime Connector", filters={"is_enabled": 1}, fieldname="name")
-    if not enabled_connector:
-        raise Exception("No enabled BioTime Connector found")
-    
-    connector = frappe.get_doc("BioTime Connector", enabled_connector)
+    connector = get_connector(connector_name)
     access_token = connector.get_password('access_token')
     
     # If no access token exists, get a new one
@@ -40,7 +65,7 @@ def get_connector_with_headers() -> tuple:
     # Check if the access token is valid by making a test request
     try:
         url = f"{connector.company_portal}/iclock/api/terminals/"
-        response = requests.get(url, headers=headers, timeout=3000)
+        response = biotime_request(connector, "GET", url, headers=headers, timeout=REQUEST_TIMEOUT)
         
         # access token is valid
         if response.status_code == 200:
@@ -64,74 +89,98 @@ def get_connector_with_headers() -> tuple:
 
 
 @frappe.whitelist()
-def fetch_and_create_devices(device_id=None) -> None | dict:
+def fetch_and_create_devices(device_id=None, connector=None) -> None | dict:
     """
     Fetch devices from BioTime and create them in ERPNext. http://{ip}/iclock/api/terminals/
     Or fetch a single device by ID.
     """
 
-    connector, headers = get_connector_with_headers()
+    connector = get_connector(connector)
 
     try:
-        url = (
-            f"{connector.company_portal}/iclock/api/terminals/"
-            if not device_id
-            else f"{connector.company_portal}/iclock/api/terminals/{device_id}/"
-        )
-        response = requests.get(url, headers=headers, timeout=3000)
-        if response.status_code == 200:
-            if device_id:
-                data = response.json()
-                return {
-                    "device_id": data["id"],
-                    "device_name": data["terminal_name"],
-                    "device_alias": data["alias"],
-                    "device_ip_address": data["ip_address"],
-                    "last_activity": data["last_activity"],
-                    "last_sync_request": frappe.utils.now_datetime(),
-                    "device_area": f"{data['area']['area_name']} - {data['area']['area_code']}",
-                }
-            devices = response.json()["data"]
-            _created_devices = []
-            for device in devices:
-                try:
-                    device_doc = frappe.new_doc("BioTime Device")
-                    device_doc.device_id = device["id"]
-                    device_doc.device_name = device["terminal_name"]
-                    device_doc.device_alias = device["alias"]
-                    device_doc.device_ip_address = device["ip_address"]
-                    device_doc.last_activity = device["last_activity"]
-                    device_doc.last_sync_request = frappe.utils.now_datetime()
-                    device_doc.device_area = f"{device['area']['area_name']} - {device['area']['area_code']}"
-                    device_doc.insert(ignore_permissions=True)
-                    _created_devices.append(device_doc)
-                except frappe.DuplicateEntryError:
-                    logger.error("Device already exists in ERPNext: %s", device["terminal_name"])
-                    continue
-            frappe.msgprint(f"{len(_created_devices)} new device(s) created successfully")
-        else:
-            logger.error("Failed to fetch device(s). Status code: %d", response.status_code)
-            return {}
-    except requests.RequestException as e:
+        if device_id:
+            data = get_terminal(connector, device_id)
+            return {
+                "device_id": data["id"],
+                "device_name": data["terminal_name"],
+                "device_alias": data["alias"],
+                "device_sn": data.get("sn"),
+                "device_ip_address": data["ip_address"],
+                "last_activity": data["last_activity"],
+                "last_sync_request": frappe.utils.now_datetime(),
+                "device_area": f"{data['area']['area_name']} - {data['area']['area_code']}",
+                "biotime_connector": connector.name,
+            }
+        created = create_devices(connector)
+        frappe.msgprint(f"{created} new device(s) created successfully")
+    except httpx.HTTPStatusError as e:
+        logger.error("Failed to fetch device(s). Status code: %d", e.response.status_code)
+        return {}
+    except httpx.HTTPError as e:
         logger.error("HTTPError occurred during API call: %s", str(e))
         raise e
 
 
+def create_devices(connector, progress=None) -> int:
+    """
+    Create a BioTime Device for every terminal of the connector that is not in
+    ERPNext yet and return how many were created. A `progress` (SyncProgress)
+    is updated and checked for cancellation after every device.
+    """
+    devices = list_terminals(connector)
+    created = 0
+    if progress:
+        progress.start_phase("insert", total_rows=len(devices))
+    for device in devices:
+        check_cancelled(progress)
+        if progress:
+            progress.add(rows=1)
+        try:
+            device_doc = frappe.new_doc("BioTime Device")
+            device_doc.device_id = device["id"]
+            device_doc.device_name = device["terminal_name"]
+            device_doc.device_alias = device["alias"]
+            device_doc.device_sn = device.get("sn")
+            device_doc.device_ip_address = device["ip_address"]
+            device_doc.last_activity = device["last_activity"]
+            device_doc.last_sync_request = frappe.utils.now_datetime()
+            device_doc.device_area = f"{device['area']['area_name']} - {device['area']['area_code']}"
+            device_doc.biotime_connector = connector.name
+            device_doc.insert(ignore_permissions=True)
+            created += 1
+        except frappe.DuplicateEntryError:
+            logger.error("Device already exists in ERPNext: %s", device["terminal_name"])
+            # Devices created before the serial number was stored get it on the next fetch
+            if device.get("sn"):
+                frappe.db.set_value("BioTime Device", device_doc.name, "device_sn", device["sn"])
+            continue
+    return created
+
+
+INGEST_CHUNK_SIZE = 500
+# Jobs that try to insert a (employee, shift date) group whose attendance lock is busy
+INGEST_LOCK_ATTEMPTS = 3
+
+TRANSACTION_PARAMS = ["start_time", "end_time", "page_size", "emp_code", "terminal_sn", "terminal_alias"]
+
+
 def fetch_transactions(*args, **kwargs) -> tuple[list, list]:
     """
     Fetch transactions from BioTime with improved error handling and retry logic.
+    With `replay=True`, the pages stored by the raw page cache are used instead of the API.
+    A `progress` (SyncProgress) is updated and checked for cancellation after every page.
     """
+    progress = kwargs.get("progress")
+    if kwargs.get("replay"):
+        return replay_transactions(**kwargs)
+
     max_retries = 3
     retry_count = 0
     
     while retry_count < max_retries:
         try:
-            connector, headers = get_connector_with_headers()
-            params = {
-                k: v
-                for k, v in kwargs.items()
-                if k in ["start_time", "end_time", "page_size", "emp_code", "terminal_sn", "terminal_alias"]
-            }
+            connector, headers = get_connector_with_headers(kwargs.get("connector"))
+            params = {k: v for k, v in kwargs.items() if k in TRANSACTION_PARAMS}
 
             page = 1
             checkins = []
@@ -139,30 +188,20 @@ def fetch_transactions(*args, **kwargs) -> tuple[list, list]:
             is_next = True
             
             while is_next:
+                check_cancelled(progress)
                 url = f"{connector.company_portal}/iclock/api/transactions/"
                 params_with_page = dict(params, page=page)
-                response = requests.get(url, params=params_with_page, headers=headers, timeout=3000)
+                response = biotime_request(connector, "GET", url, params=params_with_page, headers=headers, timeout=REQUEST_TIMEOUT)
                 
                 if response.status_code == 200:
+                    store_page(connector.name, params, page, response.content)
                     transactions = response.json()
-                    for transaction in transactions["data"]:
-                        filters = {"attendance_device_id": transaction["emp_code"]}
-                        code = frappe.db.get_value("Employee", filters=filters, fieldname="name")
-                        _transaction_dict = {
-                            "first_name": transaction["first_name"],
-                            "last_name": transaction["last_name"],
-                            "department": transaction["department"],
-                            "position": transaction["position"],
-                            "device_sn": transaction["terminal_sn"],
-                            "device_alias": transaction["terminal_alias"],
-                            "log_type": "IN" if transaction["punch_state_display"] == "Check In" else "OUT",
-                            "time": transaction["punch_time"],
-                        }
-                        if code:
-                            checkins.append(dict(_transaction_dict, employee=code))
-                        else:
-                            # Employee not found in ERPNext, save the transaction in a separate Checkin Log
-                            biotime_checkins.append(dict(_transaction_dict, biotime_employee_code=transaction["emp_code"]))
+                    page_checkins, page_biotime_checkins = split_transactions(transactions["data"], connector.name)
+                    checkins.extend(page_checkins)
+                    biotime_checkins.extend(page_biotime_checkins)
+                    if progress:
+                        progress.set_total(rows=transactions.get("count"))
+                        progress.add(rows=len(transactions["data"]), pages=1)
 
                     is_next = bool(transactions["next"])
                     page += 1
@@ -172,13 +211,15 @@ def fetch_transactions(*args, **kwargs) -> tuple[list, list]:
                     retry_count += 1
                     if retry_count >= max_retries:
                         raise Exception("Max retries exceeded for authentication")
+                    connector = refresh_connector_token(connector.name)
+                    headers["Authorization"] = f"JWT {connector.get_password('access_token')}"
                     continue
                 else:
                     logger.error("Failed to fetch transactions. Status code: %d, Response: %s", 
                                response.status_code, response.text)
                     response.raise_for_status()
             
-            return checkins, biotime_checkins
+            return debounce_checkins(checkins, biotime_checkins)
             
         except requests.RequestException as e:
             retry_count += 1
@@ -188,24 +229,91 @@ def fetch_transactions(*args, **kwargs) -> tuple[list, list]:
                 raise e
             else:
                 logger.error("Request failed, retrying (%d/%d): %s", retry_count, max_retries, str(e))
+                time.sleep(backoff_delay(retry_count))
                 continue
 
 
-def insert_bulk_checkins(checkins) -> None:
+def replay_transactions(**kwargs) -> tuple[list, list]:
+    """
+    Re-run the transform for a query from its cached raw pages, without any network calls.
+    """
+    connector = get_connector(kwargs.get("connector"))
+    params = {k: v for k, v in kwargs.items() if k in TRANSACTION_PARAMS}
+    pages = get_cached_pages(connector.name, params)
+    if not pages:
+        raise Exception(f"No cached BioTime pages for this query on {connector.name}, fetch it from the portal first")
+
+    logger.info("Replaying %d cached pages for %s", len(pages), connector.name)
+    return debounce_checkins(*split_transaction_pages(pages, connector.name))
+
+
+def get_existing_checkin_keys(doctype, checkins, key_fields) -> set:
+    """
+    Keys of the checkins already stored, read from the replica in one query over
+    the batch's time span. A replica only lags, so a key found here exists for
+    sure; keys not found are still checked on the primary before inserting.
+    """
+    if not checkins:
+        return set()
+
+    times = [frappe.utils.get_datetime(checkin["time"]) for checkin in checkins]
+    with read_replica():
+        rows = frappe.get_all(
+            doctype,
+            filters={
+                key_fields[0]: ["in", list({checkin[key_fields[0]] for checkin in checkins})],
+                "time": ["between", [min(times), max(times)]],
+            },
+            fields=key_fields,
+            as_list=True,
+        )
+    return {get_checkin_key(dict(zip(key_fields, row)), key_fields) for row in rows}
+
+
+def get_checkin_key(checkin, key_fields) -> tuple:
+    return tuple(
+        frappe.utils.get_datetime(checkin.get(field)) if field == "time" else checkin.get(field) or None
+        for field in key_fields
+    )
+
+
+EMPLOYEE_CHECKIN_KEY = ["employee", "time", "log_type"]
+BIOTIME_CHECKIN_KEY = ["biotime_employee_code", "time", "log_type", "biotime_connector"]
+
+
+def insert_bulk_checkins(checkins, skip_attendance_update=False, shift_resolver=None) -> None:
     """
     Insert checkins with improved error handling and duplicate prevention.
+    With `skip_attendance_update`, attendance is not marked per checkin; the
+    caller recomputes it afterwards. With Batch Shift Resolution enabled, shifts
+    resolved for the whole batch are stamped and per checkin validation is skipped.
+
+    A deadlock is raised rather than logged: InnoDB has rolled back the whole
+    transaction, so the checkins inserted before it are gone as well.
     """
     if not checkins:
         return
         
-    checkin_docs = []
-    successful_inserts = 0
+    inserted = []
     failed_inserts = 0
+    employee_names = dict(
+        frappe.get_all(
+            "Employee",
+            filters={"name": ["in", list({checkin["employee"] for checkin in checkins})]},
+            fields=["name", "employee_name"],
+            as_list=True,
+        )
+    )
+    if not batch_shift_resolution_enabled():
+        shift_resolver = None
+    elif not shift_resolver:
+        shift_resolver = ShiftResolver(checkins)
+    existing_keys = get_existing_checkin_keys("Employee Checkin", checkins, EMPLOYEE_CHECKIN_KEY)
 
     for checkin in checkins:
         try:
             # Check for duplicate checkins
-            existing_checkin = frappe.db.exists("Employee Checkin", {
+            existing_checkin = get_checkin_key(checkin, EMPLOYEE_CHECKIN_KEY) in existing_keys or frappe.db.exists("Employee Checkin", {
                 "employee": checkin["employee"],
                 "time": checkin["time"],
                 "log_type": checkin["log_type"]
@@ -218,25 +326,141 @@ def insert_bulk_checkins(checkins) -> None:
                 
             checkin_doc = frappe.new_doc("Employee Checkin")
             checkin_doc.employee = checkin["employee"]
-            checkin_doc.employee_name = frappe.db.get_value("Employee", checkin["employee"], "employee_name")
+            checkin_doc.employee_name = employee_names.get(checkin["employee"])
             checkin_doc.log_type = checkin["log_type"]
             checkin_doc.time = checkin["time"]
             checkin_doc.device_id = f"{checkin['device_sn']} - {checkin['device_alias']}"
+            checkin_doc.flags.skip_attendance_update = skip_attendance_update
+            if shift_resolver and (shift := shift_resolver.resolve(checkin)):
+                # Duplicates are checked above; validation would only fetch the shift again
+                checkin_doc.update(shift)
+                checkin_doc.flags.ignore_validate = True
             checkin_doc.insert(ignore_permissions=True)
-            checkin_docs.append(checkin_doc)
-            successful_inserts += 1
+            inserted.append(checkin)
 
+        except frappe.QueryDeadlockError:
+            raise
         except Exception as e:
             failed_inserts += 1
             trace = str(e) + frappe.get_traceback(with_context=True)
             logger.error("Failed to insert checkin for employee %s: %s", 
                         checkin.get("employee", "Unknown"), trace)
     
-    if successful_inserts > 0:
-        logger.error("Successfully inserted %d checkins", successful_inserts)
+    # Only punches that were actually inserted count towards the daily summary
+    update_daily_punch_summary(inserted, employee_names)
+
+    if inserted:
+        logger.error("Successfully inserted %d checkins", len(inserted))
     if failed_inserts > 0:
         logger.error("Failed to insert %d checkins", failed_inserts)
 
+
+def get_employee_shard(employee, shard_count) -> int:
+    return zlib.crc32(employee.encode()) % shard_count
+
+
+def ingest_checkins(checkins) -> None:
+    """
+    Insert checkins inline, or spread them over `Ingest Workers` parallel jobs
+    when configured in BioTime Settings.
+
+    Checkins are hash-sharded by employee, so every punch of an employee lands
+    in the same job and attendance for that employee is marked by one worker.
+    Either way they are inserted by insert_checkins_shard, under attendance locks.
+    """
+    shard_count = cint(get_biotime_settings().ingest_workers)
+    if shard_count <= 1:
+        insert_checkins_shard(checkins)
+        return
+
+    shards = [[] for _ in range(shard_count)]
+    for checkin in checkins:
+        shards[get_employee_shard(checkin["employee"], shard_count)].append(checkin)
+
+    for index, shard in enumerate(shards, start=1):
+        if shard:
+            frappe.enqueue(
+                insert_checkins_shard,
+                queue="long",
+                job_name=f"BioTime Checkin Ingest {index}/{shard_count}",
+                checkins=shard,
+            )
+
+
+def ingest_in_chunks(checkins, biotime_checkins, progress=None, chunk_size=INGEST_CHUNK_SIZE) -> None:
+    """
+    Ingest both checkin lists, committing every `chunk_size` rows when a sync
+    reports its progress so the user sees the insert advance and can cancel it.
+    """
+    if not progress:
+        ingest_checkins(checkins)
+        insert_bulk_biotime_checkins(biotime_checkins)
+        return
+
+    progress.start_phase("insert", total_rows=len(checkins) + len(biotime_checkins))
+    for records, insert in ((checkins, ingest_checkins), (biotime_checkins, insert_bulk_biotime_checkins)):
+        for index in range(0, len(records), chunk_size):
+            progress.check_cancelled()
+            chunk = records[index : index + chunk_size]
+            insert(chunk)
+            frappe.db.commit()
+            progress.add(rows=len(chunk))
+
+
+def get_shift_date(checkin, shift_resolver):
+    """The date of the shift the punch counts towards when clear cut, else its calendar date."""
+    window = shift_resolver.resolve(checkin)
+    return (window.shift_start if window else get_datetime(checkin["time"])).date()
+
+
+def insert_checkins_shard(checkins, attempt=1) -> None:
+    """
+    Insert checkins one (employee, shift date) group at a time. Each group is
+    inserted and committed under the attendance lock of that day, so another
+    sync marking the same Attendance waits until the rows written here are
+    visible, and each lock is held for a single day's punches only.
+
+    Groups whose lock stays busy or whose transaction deadlocks are retried in
+    a new job, up to INGEST_LOCK_ATTEMPTS times; the other groups go ahead.
+    """
+    if not checkins:
+        return
+
+    # A deadlock rolls back the whole transaction; keep it to the group that hit it
+    frappe.db.commit()
+
+    shift_resolver = ShiftResolver(checkins)
+
+    def group_key(checkin):
+        return checkin["employee"], get_shift_date(checkin, shift_resolver)
+
+    checkins = sorted(checkins, key=lambda checkin: (*group_key(checkin), str(checkin["time"])))
+
+    skipped = []
+    for (employee, shift_date), group in groupby(checkins, key=group_key):
+        group = list(group)
+        if not run_with_attendance_lock(
+            employee, shift_date, insert_bulk_checkins, group, False, shift_resolver
+        ):
+            skipped.extend(group)
+
+    if not skipped:
+        return
+    if attempt >= INGEST_LOCK_ATTEMPTS:
+        frappe.log_error(
+            message=f"{len(skipped)} checkins were not inserted after {attempt} attempts:\n"
+            + "\n".join(f"{checkin['employee']} {checkin['time']}" for checkin in skipped),
+            title="BioTime checkins not inserted",
+        )
+        return
+    frappe.enqueue(
+        insert_checkins_shard,
+        queue="long",
+        job_name=f"BioTime Checkin Ingest Retry {attempt}",
+        checkins=skipped,
+        attempt=attempt + 1,
+    )
+
         
 def insert_bulk_biotime_checkins(checkins) -> None:
     """
@@ -247,14 +471,16 @@ def insert_bulk_biotime_checkins(checkins) -> None:
         
     successful_inserts = 0
     failed_inserts = 0
+    existing_keys = get_existing_checkin_keys("BioTime Checkins", checkins, BIOTIME_CHECKIN_KEY)
     
     for checkin in checkins:
         try:
             # Check for duplicate biotime checkins
-            existing_checkin = frappe.db.exists("BioTime Checkins", {
+            existing_checkin = get_checkin_key(checkin, BIOTIME_CHECKIN_KEY) in existing_keys or frappe.db.exists("BioTime Checkins", {
                 "biotime_employee_code": checkin["biotime_employee_code"],
                 "time": checkin["time"],
-                "log_type": checkin["log_type"]
+                "log_type": checkin["log_type"],
+                "biotime_connector": checkin.get("biotime_connector"),
             })
             
             if existing_checkin:
@@ -272,6 +498,7 @@ def insert_bulk_biotime_checkins(checkins) -> None:
             checkin_doc.device_alias = checkin["device_alias"]
             checkin_doc.log_type = checkin["log_type"]
             checkin_doc.time = checkin["time"]
+            checkin_doc.biotime_connector = checkin.get("biotime_connector")
             checkin_doc.insert(ignore_permissions=True)
             successful_inserts += 1
 
@@ -300,11 +527,13 @@ def refresh_connector_token(docname):
         if not non_hashed_password:
             raise Exception("No password found for BioTime Connector")
             
-        response = requests.post(
+        response = biotime_request(
+            connector,
+            "POST",
             url,
             data=json.dumps({"username": connector.username, "password": non_hashed_password}),
             headers=headers,
-            timeout=3000
+            timeout=REQUEST_TIMEOUT
         )
         
         if response.status_code == 200:
@@ -329,7 +558,7 @@ def fetch_and_insert(*args, **kwargs):
     print("checkins", checkins)
     print("biotime_checkins", biotime_checkins)
 
-    insert_bulk_checkins(checkins)
+    ingest_checkins(checkins)
     insert_bulk_biotime_checkins(biotime_checkins)
 
 
@@ -348,7 +577,11 @@ def insert_location(*args, **kwargs):
 
     # A dict of {employee-time-log_type: docname}
     checkin_records = {}
-    for doc in frappe.get_all("Employee Checkin", fields=["name", "employee", "time", "log_type"], filters=filters):
+    with read_replica():
+        existing_checkins = frappe.get_all(
+            "Employee Checkin", fields=["name", "employee", "time", "log_type"], filters=filters
+        )
+    for doc in existing_checkins:
         checkin_records[f"{doc.employee}-{doc.time}-{doc.log_type}"] = doc.name
 
     print("Existing Employee Checkins", checkin_records)
@@ -377,11 +610,12 @@ def get_last_checkin(device: dict) -> datetime | None:
     Get the last checkin time for a device with improved error handling.
     """
     try:
-        last_timestamp = frappe.db.get_all(
-            "Employee Checkin",
-            filters={"device_id": ["like", "%" + device.get("device_alias") + "%"]},
-            fields=["MAX(time) as time"],
-        )
+        with read_replica():
+            last_timestamp = frappe.db.get_all(
+                "Employee Checkin",
+                filters={"device_id": ["like", "%" + device.get("device_alias") + "%"]},
+                fields=["MAX(time) as time"],
+            )
         
         if last_timestamp and last_timestamp[0].get("time"):
             return last_timestamp[0].get("time")
@@ -434,7 +668,7 @@ def extract_next_page_number(next_url: str) -> int | None:
         return None
     
 
-def fetch_transactions_by_pagination(page=None,last_synced_id=None ,page_size=100, max_records=100) -> tuple[list, list, str, int]:
+def fetch_transactions_by_pagination(page=None,last_synced_id=None ,page_size=100, max_records=100, connector=None) -> tuple[list, list, str, int]:
     """
     Fetch transactions from BioTime using pagination with a record limit.
     This is more reliable than date-based queries for hourly sync.
@@ -444,11 +678,12 @@ def fetch_transactions_by_pagination(page=None,last_synced_id=None ,page_size=10
         last_synced_id: The last transaction ID that was synced (to skip already processed records)
         page_size: Number of records to request per API page (default: 200)
         max_records: Maximum number of NEW records to fetch per sync (default: 200)
+        connector: BioTime Connector to fetch from (default: first enabled connector)
     
     Returns:
         tuple: (checkins, biotime_checkins, next_page , last_synced_id)
     """
-    connector, headers = get_connector_with_headers()
+    connector, headers = get_connector_with_headers(connector)
     url = f"{connector.company_portal}/iclock/api/transactions/"
 
     checkins, biotime_checkins = [], []
@@ -461,7 +696,7 @@ def fetch_transactions_by_pagination(page=None,last_synced_id=None ,page_size=10
                 "page_size": page_size,
             }
                     
-            response = requests.get(url, params=params, headers=headers, timeout=3000)
+            response = biotime_request(connector, "GET", url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
             if response.status_code == 200:
                 transactions = response.json()
                 data=transactions.get("data", [])
@@ -472,33 +707,22 @@ def fetch_transactions_by_pagination(page=None,last_synced_id=None ,page_size=10
 
                 # Skip already synced records
                 next_id=skip_synced_id(data, last_synced_id)
+                employees = get_employees_by_device_code(transaction["emp_code"] for transaction in data[next_id:])
                 
                 for transaction in data[next_id:]:
                     
                     # Check if we've reached the max_records limit
                     if len(biotime_checkins) + len(checkins) >= max_records:
 
-                        return checkins, biotime_checkins, next_page, last_synced_id
-                    
-                    filters = {"attendance_device_id": transaction["emp_code"]}
-                    code = frappe.db.get_value("Employee", filters=filters, fieldname="name")
+                        return *debounce_checkins(checkins, biotime_checkins), next_page, last_synced_id
                     
-                    _transaction_dict = {
-                        "first_name": transaction["first_name"],
-                        "last_name": transaction["last_name"],
-                        "department": transaction["department"],
-                        "position": transaction["position"],
-                        "device_sn": transaction["terminal_sn"],
-                        "device_alias": transaction["terminal_alias"],
-                        "log_type": "IN" if transaction["punch_state_display"] == "Check In" else "OUT",
-                        "time": transaction["punch_time"],
-                        "transaction_id": transaction.get("id")  # Store transaction ID
-                    }
+                    code = employees.get(transaction["emp_code"])
+                    record = BioTimeTransaction.from_api(transaction, code, connector.name)
                     
                     if code:
-                        checkins.append(dict(_transaction_dict, employee=code))
+                        checkins.append(record)
                     else:
-                        biotime_checkins.append(dict(_transaction_dict, biotime_employee_code=transaction["emp_code"]))
+                        biotime_checkins.append(record)
 
                     # Update last_synced_id to the highest transaction ID
                     current_id = transaction.get("id", 0)
@@ -523,18 +747,39 @@ def fetch_transactions_by_pagination(page=None,last_synced_id=None ,page_size=10
             logger.error(f"HTTPError during fetch: {trace}")
             raise e
 
-    return checkins, biotime_checkins, next_page, last_synced_id
+    return *debounce_checkins(checkins, biotime_checkins), next_page, last_synced_id
                 
 
 def sync_devices_with_pagination() -> None:
     """
     Sync all devices using pagination.
     This is the new recommended method for hourly sync.
+
+    Every enabled connector is synced as its own background job so that
+    separate BioTime portals run in parallel on different workers. A connector
+    whose previous run is still queued or running is skipped: both runs would
+    resume from the same watermark and fetch the same pages.
+    """
+    for connector_name in get_enabled_connectors():
+        job_name = f"BioTime Sync {connector_name}"
+        if is_job_queued(job_name, queue="long"):
+            logger.info("Hourly sync of %s is still queued or running, skipping", connector_name)
+            continue
+        frappe.enqueue(
+            sync_connector_with_pagination,
+            queue="long",
+            job_name=job_name,
+            connector_name=connector_name,
+        )
+
+
+def sync_connector_with_pagination(connector_name) -> None:
+    """
+    Sync a single connector using pagination, resuming from its own watermark.
     """
     try:
         
-        connector_doc = frappe.get_doc("BioTime Connector", 
-                                     frappe.db.get_value("BioTime Connector", {"is_enabled": 1}))
+        connector_doc = frappe.get_doc("BioTime Connector", connector_name)
         
         last_synced_id = connector_doc.last_synced_id or 0
         last_synced_page=connector_doc.last_synced_page 
@@ -543,11 +788,12 @@ def sync_devices_with_pagination() -> None:
             page=last_synced_page,
             last_synced_id=last_synced_id,
             page_size=100,
-            max_records=connector_doc.hourly_sync_limit
+            max_records=connector_doc.hourly_sync_limit,
+            connector=connector_doc.name,
         )
         
         if device_checkins or biotime_checkins:
-            insert_bulk_checkins(device_checkins)
+            ingest_checkins(device_checkins)
             insert_bulk_biotime_checkins(biotime_checkins)
 
             connector_doc.last_synced_page = next_page
@@ -555,12 +801,12 @@ def sync_devices_with_pagination() -> None:
             connector_doc.save(ignore_permissions=True)
             frappe.db.commit()
                             
-            logger.error("ID-based sync completed: %d employee checkins, %d biotime checkins, last synced page: %s, last synced id: %d",
-                       len(device_checkins), len(biotime_checkins), next_page, last_synced_portal_id)
+            logger.error("ID-based sync completed for %s: %d employee checkins, %d biotime checkins, last synced page: %s, last synced id: %d",
+                       connector_name, len(device_checkins), len(biotime_checkins), next_page, last_synced_portal_id)
         else:
-            logger.error("No new data found since: %s",)            
+            logger.error("No new data found for %s since id: %s", connector_name, last_synced_id)
     except Exception as e:
-        logger.error("Critical error in ID-based sync: %s", str(e))
+        logger.error("Critical error in ID-based sync for %s: %s", connector_name, str(e))
         raise e
 
 
@@ -0,0 +1,31 @@
+import frappe
+
+
+def get_request_cached_doc(doctype, name=None):
+    """
+    `frappe.get_cached_doc` memoized on `frappe.local` for the current request or job,
+    so hot paths like the Employee Checkin hook skip even the Redis round trip.
+    Entries are dropped by `clear_request_cached_doc` when the document is saved.
+    """
+    cache = getattr(frappe.local, "biotime_doc_cache", None)
+    if cache is None:
+        cache = frappe.local.biotime_doc_cache = {}
+
+    key = (doctype, name or doctype)
+    if key not in cache:
+        cache[key] = frappe.get_cached_doc(doctype, name or doctype)
+    return cache[key]
+
+
+def clear_request_cached_doc(doc, event=None):
+    cache = getattr(frappe.local, "biotime_doc_cache", None)
+    if cache:
+        cache.pop((doc.doctype, doc.name), None)
+
+
+def get_biotime_settings():
+    return get_request_cached_doc("BioTime Settings")
+
+
+def get_shift_type(shift_name):
+    return get_request_cached_doc("Shift Type", shift_name)
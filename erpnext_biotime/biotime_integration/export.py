@@ -0,0 +1,202 @@
+import csv
+import io
+import json
+
+import frappe
+from frappe.desk.reportview import get_match_cond
+from frappe.utils import cint, get_datetime, getdate
+from werkzeug.wrappers import Response
+
+logger = frappe.logger("biotime", allow_site=True, file_count=50)
+
+EXPORT_CHUNK_SIZE = 5000
+
+# Exportable doctype -> (keyset column, exported columns)
+EXPORT_COLUMNS = {
+    "Employee Checkin": (
+        "time",
+        [
+            "name",
+            "employee",
+            "employee_name",
+            "log_type",
+            "time",
+            "device_id",
+            "shift",
+            "shift_start",
+            "shift_end",
+            "shift_actual_start",
+            "shift_actual_end",
+            "attendance",
+            "modified",
+        ],
+    ),
+    "BioTime Checkins": (
+        "time",
+        [
+            "name",
+            "biotime_employee_code",
+            "first_name",
+            "last_name",
+            "department",
+            "position",
+            "device_sn",
+            "device_alias",
+            "log_type",
+            "time",
+            "biotime_connector",
+            "modified",
+        ],
+    ),
+    "Attendance": (
+        "attendance_date",
+        [
+            "name",
+            "employee",
+            "employee_name",
+            "attendance_date",
+            "status",
+            "shift",
+            "in_time",
+            "out_time",
+            "working_hours",
+            "late_entry",
+            "early_exit",
+            "modified",
+        ],
+    ),
+}
+
+
+def iter_rows(doctype, start, end, match_conditions="", chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Rows of `doctype` with the keyset column in [start, end), or [start, end] for
+    the Attendance date, in (column, name) order. `match_conditions` are the
+    requesting user's permission conditions (`get_match_cond`).
+
+    Each chunk continues after the last (column, name) seen instead of using an
+    offset, so every chunk is an index range scan however deep the export is.
+    """
+    column, fields = EXPORT_COLUMNS[doctype]
+    select = ", ".join(f"`tab{doctype}`.`{field}`" for field in fields)
+    if doctype == "Attendance":
+        # A date range ends on its last day, unlike a datetime range
+        conditions = f"`{column}` >= %(start)s AND `{column}` <= %(end)s AND docstatus = 1"
+    else:
+        conditions = f"`{column}` >= %(start)s AND `{column}` < %(end)s"
+    conditions += match_conditions
+
+    last = None
+    while True:
+        keyset = (
+            f"AND (`{column}` > %(last_value)s OR (`{column}` = %(last_value)s AND `tab{doctype}`.name > %(last_name)s))"
+            if last
+            else ""
+        )
+        rows = iter_query(
+            f"""
+            SELECT {select} FROM `tab{doctype}`
+            WHERE {conditions} {keyset}
+            ORDER BY `{column}`, `tab{doctype}`.name
+            LIMIT {cint(chunk_size)}
+            """,
+            {
+                "start": start,
+                "end": end,
+                "last_value": last and last[column],
+                "last_name": last and last.name,
+            },
+        )
+
+        count = 0
+        for row in rows:
+            count += 1
+            last = row
+            yield row
+        if count < chunk_size:
+            return
+
+
+def iter_query(query, values):
+    """Stream a chunk from a server side cursor where the framework offers one."""
+    if hasattr(frappe.db, "unbuffered_cursor"):
+        with frappe.db.unbuffered_cursor():
+            yield from frappe.db.sql(query, values, as_dict=True, as_iterator=True)
+    else:
+        yield from frappe.db.sql(query, values, as_dict=True)
+
+
+def to_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, default=str) + "\n"
+
+
+def to_csv(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    for index, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if index % 500 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@frappe.whitelist(methods=["GET"])
+def export_records(doctype, start_time, end_time, format="ndjson"):
+    """
+    Stream Employee Checkin, BioTime Checkins or Attendance for [start_time, end_time)
+    as NDJSON or CSV, in constant memory:
+
+        GET /api/method/erpnext_biotime.biotime_integration.export.export_records
+            ?doctype=Employee Checkin&start_time=2026-01-01&end_time=2027-01-01&format=csv
+
+    Attendance is selected by attendance date from the start date to the end
+    date, both included. Rows are limited by the user's User Permissions.
+
+    The body is written after the request returns, so the web server must let a
+    response run as long as the export: gunicorn's sync workers are killed after
+    their `--timeout` (bench default 120s), so serve long exports from gthread or
+    gevent workers or raise the timeout. `bench serve` streams without a limit.
+    """
+    if doctype not in EXPORT_COLUMNS:
+        frappe.throw(f"Exporting {doctype} is not supported")
+    if format not in ("ndjson", "csv"):
+        frappe.throw("Format must be ndjson or csv")
+    frappe.has_permission(doctype, "export", throw=True)
+
+    if doctype == "Attendance":
+        start, end = getdate(start_time), getdate(end_time)
+    else:
+        start, end = get_datetime(start_time), get_datetime(end_time)
+
+    site, sites_path, user = frappe.local.site, frappe.local.sites_path, frappe.session.user
+    fields = EXPORT_COLUMNS[doctype][1]
+    # Raw SQL skips User Permissions; resolve them while the request's user is set
+    match_conditions = get_match_cond(doctype, as_condition=True)
+
+    def stream():
+        # Werkzeug iterates the body after frappe.app's `finally` has called
+        # frappe.destroy(), so the generator sets up (and tears down) its own
+        # site context, DB connection and session user.
+        frappe.init(site=site, sites_path=sites_path)
+        try:
+            frappe.connect()
+            frappe.set_user(user)
+            rows = iter_rows(doctype, start, end, match_conditions)
+            yield from to_csv(rows, fields) if format == "csv" else to_ndjson(rows)
+        except Exception:
+            logger.error("Export of %s failed: %s", doctype, frappe.get_traceback())
+            raise
+        finally:
+            frappe.destroy()
+
+    file_name = f"{frappe.scrub(doctype)}_{start}_{end}.{format}".replace(" ", "_").replace(":", "-")
+    return Response(
+        stream(),
+        mimetype="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+        direct_passthrough=True,
+    )
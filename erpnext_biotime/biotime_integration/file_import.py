@@ -0,0 +1,197 @@
+import csv
+import os
+import re
+from datetime import datetime, time, timedelta
+
+import frappe
+from frappe.utils import cint, get_datetime, get_time, getdate
+
+from erpnext_biotime.biotime_integration.biotime_integration import ingest_checkins, insert_bulk_biotime_checkins
+from erpnext_biotime.biotime_integration.transactions import debounce_checkins, split_transactions
+
+logger = frappe.logger("biotime", allow_site=True, file_count=50)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Transactions API field -> column headers used by BioTime exports (normalized)
+COLUMN_ALIASES = {
+    "emp_code": ("emp code", "employee id", "employee code", "personnel id", "person id"),
+    "first_name": ("first name",),
+    "last_name": ("last name",),
+    "department": ("department", "department name"),
+    "position": ("position", "position name"),
+    "punch_time": ("punch time", "datetime", "check time"),
+    "punch_date": ("date", "punch date"),
+    "punch_clock": ("time",),
+    "punch_state_display": ("punch state display", "punch state", "punch status", "state"),
+    "terminal_sn": ("terminal sn", "device sn", "serial number"),
+    "terminal_alias": ("terminal alias", "device alias", "device name", "terminal name"),
+}
+CHECK_IN_STATES = ("check in", "checkin", "in", "0")
+
+
+def normalize_header(header) -> str:
+    return re.sub(r"[\s_]+", " ", str(header or "")).strip().lower()
+
+
+def get_column_map(headers) -> dict:
+    """Map transactions API fields to column indexes of an export file."""
+    normalized = [normalize_header(header) for header in headers]
+    column_map = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                column_map[field] = normalized.index(alias)
+                break
+
+    if "emp_code" not in column_map or not (
+        "punch_time" in column_map or {"punch_date", "punch_clock"} <= set(column_map)
+    ):
+        frappe.throw("The file needs an employee code column and a punch time (or date and time) column")
+    return column_map
+
+
+def combine_punch_time(punch_date, punch_clock) -> datetime:
+    """
+    Punch time from separate date and time columns. CSV cells are strings, while
+    XLSX cells read by openpyxl are already datetime, date, time or timedelta.
+    """
+    if isinstance(punch_date, str) and isinstance(punch_clock, str):
+        return get_datetime(f"{punch_date} {punch_clock}")
+
+    if isinstance(punch_clock, datetime):
+        punch_clock = punch_clock.time()
+    elif isinstance(punch_clock, timedelta):
+        punch_clock = (datetime.min + punch_clock).time()
+    elif not isinstance(punch_clock, time):
+        punch_clock = get_time(punch_clock)
+    return datetime.combine(getdate(punch_date), punch_clock)
+
+
+def to_transaction(row, column_map) -> dict | None:
+    """Shape one export row like a transactions API row, or None for blank rows."""
+
+    def value(field):
+        index = column_map.get(field)
+        return row[index] if index is not None and index < len(row) else None
+
+    emp_code = value("emp_code")
+    if emp_code in (None, ""):
+        return None
+
+    if "punch_time" in column_map:
+        punch_time = get_datetime(value("punch_time"))
+    else:
+        punch_time = combine_punch_time(value("punch_date"), value("punch_clock"))
+
+    state = normalize_header(value("punch_state_display"))
+    return {
+        "emp_code": str(emp_code).strip(),
+        "first_name": value("first_name"),
+        "last_name": value("last_name"),
+        "department": value("department"),
+        "position": value("position"),
+        "punch_time": punch_time,
+        "punch_state_display": "Check In" if state in CHECK_IN_STATES else "Check Out",
+        "terminal_sn": value("terminal_sn"),
+        "terminal_alias": value("terminal_alias"),
+    }
+
+
+def iter_file_rows(path):
+    """Return the row count and a lazy row iterator for a CSV or XLSX export."""
+    if path.lower().endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        sheet = workbook.active
+
+        def sheet_rows():
+            try:
+                yield from sheet.iter_rows(values_only=True)
+            finally:
+                workbook.close()
+
+        return sheet.max_row, sheet_rows()
+
+    with open(path, newline="", encoding="utf-8-sig") as export:
+        total_rows = sum(1 for _ in export)
+
+    def rows():
+        with open(path, newline="", encoding="utf-8-sig") as export:
+            yield from csv.reader(export)
+
+    return total_rows, rows()
+
+
+def import_transactions_file(file_name, connector=None, chunk_size=DEFAULT_CHUNK_SIZE) -> None:
+    """
+    Import a BioTime transactions export (CSV or XLSX) chunk by chunk through the
+    same mapping, de-bounce and insert logic as the API sync.
+    """
+    file_doc = frappe.get_doc("File", file_name)
+    total_rows, rows = iter_file_rows(file_doc.get_full_path())
+
+    column_map = get_column_map(next(rows, []))
+    chunk, processed, skipped = [], 0, 0
+    for row in rows:
+        processed += 1
+        try:
+            transaction = to_transaction(row, column_map)
+        except Exception as e:
+            logger.error("Skipping unreadable row %d of %s: %s", processed + 1, file_doc.file_name, str(e))
+            transaction = None
+        if transaction:
+            chunk.append(transaction)
+        else:
+            skipped += 1
+
+        if len(chunk) >= chunk_size:
+            import_chunk(chunk, connector)
+            chunk = []
+            publish_import_progress(file_doc, processed, total_rows)
+
+    import_chunk(chunk, connector)
+    publish_import_progress(file_doc, processed, total_rows)
+    logger.info("Imported %d rows from %s (%d skipped)", processed - skipped, file_doc.file_name, skipped)
+
+
+def import_chunk(transactions, connector=None) -> None:
+    if not transactions:
+        return
+
+    checkins, biotime_checkins = debounce_checkins(*split_transactions(transactions, connector))
+    ingest_checkins(checkins)
+    insert_bulk_biotime_checkins(biotime_checkins)
+    frappe.db.commit()
+
+
+def publish_import_progress(file_doc, processed, total_rows) -> None:
+    # The header row counts towards the total but is not processed
+    total = max(cint(total_rows) - 1, 1)
+    frappe.publish_progress(
+        min(processed * 100 / total, 100),
+        title="Importing BioTime Transactions",
+        description=f"{processed} of {total} rows from {file_doc.file_name}",
+    )
+
+
+@frappe.whitelist()
+def enqueue_transactions_file_import(file_url, connector=None):
+    frappe.only_for("System Manager")
+
+    file_name = frappe.db.get_value("File", {"file_url": file_url}, "name")
+    if not file_name:
+        frappe.throw(f"File {file_url} not found")
+    if os.path.splitext(file_url)[1].lower() not in (".csv", ".xlsx"):
+        frappe.throw("Only CSV and XLSX exports can be imported")
+
+    frappe.enqueue(
+        import_transactions_file,
+        queue="long",
+        timeout=24 * 60 * 60,
+        job_name="BioTime Transactions File Import",
+        file_name=file_name,
+        connector=connector,
+    )
+    frappe.msgprint("Importing the transactions file in the background; progress is shown as it runs.")
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import time
+import zlib
+
+import frappe
+from frappe.utils import cint
+
+from erpnext_biotime.biotime_integration.cache import get_biotime_settings
+
+logger = frappe.logger("biotime", allow_site=True, file_count=50)
+
+CACHE_FOLDER = "biotime_page_cache"
+PAGE_SUFFIX = ".json.z"
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_SIZE_MB = 1024
+
+
+def is_enabled() -> bool:
+    return bool(cint(get_biotime_settings().enable_raw_page_cache))
+
+
+def get_cache_path(*parts) -> str:
+    return frappe.get_site_path("private", CACHE_FOLDER, *parts)
+
+
+def get_query_key(params) -> str:
+    """Stable key for a transactions query, ignoring the page number and empty filters."""
+    query = {key: str(value) for key, value in params.items() if value and key != "page"}
+    return hashlib.sha1(json.dumps(query, sort_keys=True).encode()).hexdigest()
+
+
+def get_query_folder(connector_name, params) -> str:
+    return get_cache_path(frappe.scrub(connector_name or "default"), get_query_key(params))
+
+
+def store_page(connector_name, params, page, content: bytes) -> None:
+    """Keep a compressed copy of a fetched transactions page, if the page cache is enabled."""
+    if not is_enabled():
+        return
+
+    folder = get_query_folder(connector_name, params)
+    os.makedirs(folder, exist_ok=True)
+    if cint(page) == 1:
+        # A fresh run of the query replaces whatever an earlier run stored
+        for file_name in os.listdir(folder):
+            os.remove(os.path.join(folder, file_name))
+
+    with open(os.path.join(folder, f"{cint(page):06d}{PAGE_SUFFIX}"), "wb") as page_file:
+        page_file.write(zlib.compress(content))
+
+
+def get_cached_pages(connector_name, params) -> list[bytes]:
+    """Raw page bodies previously stored for this exact query, in page order."""
+    folder = get_query_folder(connector_name, params)
+    if not os.path.isdir(folder):
+        return []
+
+    pages = []
+    for file_name in sorted(os.listdir(folder)):
+        if file_name.endswith(PAGE_SUFFIX):
+            with open(os.path.join(folder, file_name), "rb") as page_file:
+                pages.append(zlib.decompress(page_file.read()))
+    return pages
+
+
+def evict_page_cache() -> None:
+    """
+    Drop cached pages older than the configured TTL, then the oldest pages
+    until the cache fits in its size budget. Runs daily.
+    """
+    root = get_cache_path()
+    if not os.path.isdir(root):
+        return
+
+    settings = get_biotime_settings()
+    expires_before = time.time() - (cint(settings.raw_page_cache_ttl_days) or DEFAULT_TTL_DAYS) * 24 * 60 * 60
+    max_size = (cint(settings.raw_page_cache_max_size_mb) or DEFAULT_MAX_SIZE_MB) * 1024 * 1024
+
+    pages = []
+    for folder, _dirs, file_names in os.walk(root):
+        for file_name in file_names:
+            path = os.path.join(folder, file_name)
+            stat = os.stat(path)
+            pages.append((stat.st_mtime, stat.st_size, path))
+
+    pages.sort()
+    total_size = sum(size for _mtime, size, _path in pages)
+    evicted = 0
+    for mtime, size, path in pages:
+        if mtime >= expires_before and total_size <= max_size:
+            break
+        os.remove(path)
+        total_size -= size
+        evicted += 1
+
+    # Remove query folders left empty
+    for folder, dirs, file_names in os.walk(root, topdown=False):
+        if folder != root and not dirs and not file_names:
+            os.rmdir(folder)
+
+    if evicted:
+        logger.info("Evicted %d cached BioTime pages, %d bytes remain cached", evicted, total_size)
@@ -0,0 +1,194 @@
+import frappe
+from frappe.utils import add_months, cint, get_first_day, getdate, today
+
+from erpnext_biotime.biotime_integration.cache import get_biotime_settings
+
+logger = frappe.logger("biotime", allow_site=True, file_count=50)
+
+PARTITIONED_DOCTYPES = ("Employee Checkin", "BioTime Checkins")
+PARTITION_COLUMN = "time"
+HISTORY_PARTITION = "p_history"
+FUTURE_PARTITION = "p_future"
+DEFAULT_MONTHS_AHEAD = 3
+DEFAULT_MONTHS_KEPT = 12
+
+
+def is_enabled() -> bool:
+    return bool(cint(get_biotime_settings().enable_time_partitioning)) and frappe.db.db_type == "mariadb"
+
+
+def get_partition_settings() -> tuple[int, int]:
+    settings = get_biotime_settings()
+    return (
+        cint(settings.partition_months_ahead) or DEFAULT_MONTHS_AHEAD,
+        cint(settings.partition_months_kept) or DEFAULT_MONTHS_KEPT,
+    )
+
+
+def get_partition_name(month_start) -> str:
+    return f"p{getdate(month_start).strftime('%Y%m')}"
+
+
+def get_month_partition(month_start) -> str:
+    """Partition holding the month starting at `month_start`."""
+    return f"PARTITION `{get_partition_name(month_start)}` VALUES LESS THAN ('{add_months(month_start, 1)}')"
+
+
+def get_partitions(table) -> list:
+    """Existing partitions of a table in range order, empty when it is not partitioned."""
+    return frappe.db.sql(
+        """
+        SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS less_than
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+        """,
+        table,
+        as_dict=True,
+    )
+
+
+def get_other_unique_keys(table) -> list:
+    """Unique indexes besides the primary key; MariaDB needs every unique key to include the partition column."""
+    return [
+        row[0]
+        for row in frappe.db.sql(
+            """
+            SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND NON_UNIQUE = 0 AND INDEX_NAME != 'PRIMARY'
+            """,
+            table,
+        )
+    ]
+
+
+def partition_table(doctype) -> None:
+    """
+    Convert a checkin table to monthly RANGE COLUMNS partitions on `time`:
+    one history partition, one per month from `Monthly Partitions Kept` months
+    ago to `Months Ahead` months ahead, and a catch-all future partition.
+
+    The partition column has to be in the primary key, so the key becomes
+    (name, time) and `time` becomes NOT NULL. Rebuilds the table; run it off-hours.
+    """
+    table = f"tab{doctype}"
+    if get_partitions(table):
+        logger.info("%s is already partitioned", table)
+        return
+    if unique_keys := get_other_unique_keys(table):
+        frappe.throw(f"{table} has unique keys without `time` ({', '.join(unique_keys)}) and cannot be partitioned")
+    if frappe.db.sql(f"SELECT 1 FROM `{table}` WHERE `{PARTITION_COLUMN}` IS NULL LIMIT 1"):
+        frappe.throw(f"{table} has rows without a time and cannot be partitioned")
+
+    months_ahead, months_kept = get_partition_settings()
+    current_month = get_first_day(today())
+    first_month = add_months(current_month, -months_kept)
+    months = [add_months(first_month, offset) for offset in range(months_kept + months_ahead + 1)]
+
+    column_type = frappe.db.sql(
+        """
+        SELECT COLUMN_TYPE FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """,
+        (table, PARTITION_COLUMN),
+    )[0][0]
+    partitions = ",\n".join(
+        [
+            f"PARTITION `{HISTORY_PARTITION}` VALUES LESS THAN ('{first_month}')",
+            *(get_month_partition(month) for month in months),
+            f"PARTITION `{FUTURE_PARTITION}` VALUES LESS THAN (MAXVALUE)",
+        ]
+    )
+
+    logger.info("Partitioning %s into %d partitions", table, len(months) + 2)
+    frappe.db.sql_ddl(
+        f"""
+        ALTER TABLE `{table}`
+            MODIFY `{PARTITION_COLUMN}` {column_type} NOT NULL,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (`name`, `{PARTITION_COLUMN}`)
+        """
+    )
+    frappe.db.sql_ddl(f"ALTER TABLE `{table}` PARTITION BY RANGE COLUMNS(`{PARTITION_COLUMN}`) ({partitions})")
+
+
+def maintain_table_partitions(doctype) -> None:
+    """
+    Split the future partition so `Months Ahead` empty months always exist, and
+    merge monthly partitions older than `Monthly Partitions Kept` into the history one.
+    """
+    table = f"tab{doctype}"
+    partitions = get_partitions(table)
+    names = [partition.name for partition in partitions]
+    if FUTURE_PARTITION not in names or HISTORY_PARTITION not in names:
+        return
+
+    months_ahead, months_kept = get_partition_settings()
+    current_month = get_first_day(today())
+
+    new_months = [
+        month
+        for month in (add_months(current_month, offset) for offset in range(months_ahead + 1))
+        if get_partition_name(month) not in names
+    ]
+    if new_months:
+        new_partitions = ",\n".join(
+            [
+                *(get_month_partition(month) for month in new_months),
+                f"PARTITION `{FUTURE_PARTITION}` VALUES LESS THAN (MAXVALUE)",
+            ]
+        )
+        frappe.db.sql_ddl(f"ALTER TABLE `{table}` REORGANIZE PARTITION `{FUTURE_PARTITION}` INTO ({new_partitions})")
+        logger.info("Added %d monthly partitions to %s", len(new_months), table)
+
+    history_until = add_months(current_month, -months_kept)
+    expired = [
+        partition
+        for partition in partitions
+        if partition.name not in (HISTORY_PARTITION, FUTURE_PARTITION)
+        and getdate(partition.less_than.strip("'")) <= getdate(history_until)
+    ]
+    if expired:
+        # The merged partition has to end where the last merged month ended
+        frappe.db.sql_ddl(
+            f"""
+            ALTER TABLE `{table}`
+            REORGANIZE PARTITION `{HISTORY_PARTITION}`, {', '.join(f'`{partition.name}`' for partition in expired)}
+            INTO (PARTITION `{HISTORY_PARTITION}` VALUES LESS THAN ({expired[-1].less_than}))
+            """
+        )
+        logger.info("Merged %d monthly partitions of %s into %s", len(expired), table, HISTORY_PARTITION)
+
+
+def maintain_partitions() -> None:
+    """Keep the partitions of the checkin tables rolling. Runs daily when time partitioning is enabled."""
+    if not is_enabled():
+        return
+
+    for doctype in PARTITIONED_DOCTYPES:
+        try:
+            maintain_table_partitions(doctype)
+        except Exception as e:
+            logger.error("Failed to maintain partitions of %s: %s", doctype, str(e))
+
+
+def partition_tables() -> None:
+    for doctype in PARTITIONED_DOCTYPES:
+        partition_table(doctype)
+
+
+@frappe.whitelist()
+def enqueue_partition_tables():
+    frappe.only_for("System Manager")
+    if not cint(get_biotime_settings().enable_time_partitioning):
+        frappe.throw("Enable Time Partitioning in BioTime Settings first")
+    if frappe.db.db_type != "mariadb":
+        frappe.throw("Time partitioning is only available on MariaDB")
+
+    frappe.enqueue(
+        partition_tables,
+        queue="long",
+        timeout=24 * 60 * 60,
+        job_name="BioTime Partition Checkin Tables",
+    )
+    frappe.msgprint("Partitioning the checkin tables in the background. This rebuilds both tables and can take a while.")
@@ -0,0 +1,94 @@
+import time
+
+import frappe
+
+PROGRESS_EVENT = "biotime_sync_progress"
+# At most two progress events per second per sync
+MIN_PUBLISH_INTERVAL = 0.5  # seconds
+CANCEL_KEY = "biotime:sync_cancel:{0}"
+CANCEL_TTL = 24 * 60 * 60  # seconds
+
+
+class SyncCancelled(Exception):
+    pass
+
+
+class SyncProgress:
+    """
+    Batched realtime progress for one sync job, published as `biotime_sync_progress`
+    events carrying the sync id so every form tracking that sync can follow it.
+
+    Counters are updated freely; events are rate-limited. `check_cancelled` is
+    called between pages and chunks and raises `SyncCancelled` once the sync
+    was cancelled through `cancel_sync`.
+    """
+
+    def __init__(self, sync_id, title=None):
+        self.sync_id = sync_id
+        self.title = title or "BioTime Sync"
+        self.last_published = 0
+        self.start_phase("fetch")
+
+    def start_phase(self, phase, total_rows=0, total_pages=0):
+        self.phase = phase
+        self.rows, self.total_rows = 0, total_rows
+        self.pages, self.total_pages = 0, total_pages
+        self.started = time.monotonic()
+        self.publish(force=True)
+
+    def set_total(self, rows=None, pages=None):
+        self.total_rows = rows if rows is not None else self.total_rows
+        self.total_pages = pages if pages is not None else self.total_pages
+
+    def add(self, rows=0, pages=0):
+        self.rows += rows
+        self.pages += pages
+        self.publish()
+
+    def check_cancelled(self):
+        # expires=True skips frappe.local.cache, which would pin the first (empty) read for the whole job
+        if frappe.cache().get_value(CANCEL_KEY.format(self.sync_id), expires=True):
+            raise SyncCancelled(f"Sync {self.sync_id} was cancelled")
+
+    def publish(self, status="running", message=None, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_published < MIN_PUBLISH_INTERVAL:
+            return
+        self.last_published = now
+
+        elapsed = max(now - self.started, 0.001)
+        rows_per_second = self.rows / elapsed
+        eta = (self.total_rows - self.rows) / rows_per_second if rows_per_second and self.total_rows else None
+        frappe.publish_realtime(
+            PROGRESS_EVENT,
+            {
+                "sync_id": self.sync_id,
+                "title": self.title,
+                "status": status,
+                "phase": self.phase,
+                "pages": self.pages,
+                "total_pages": self.total_pages,
+                "rows": self.rows,
+                "total_rows": self.total_rows,
+                "rows_per_second": round(rows_per_second, 1),
+                "eta_seconds": round(eta) if eta is not None else None,
+                "message": message,
+            },
+            after_commit=False,
+        )
+
+    def finish(self, status="finished", message=None):
+        self.publish(status=status, message=message, force=True)
+
+
+def check_cancelled(progress) -> None:
+    if progress:
+        progress.check_cancelled()
+
+
+@frappe.whitelist()
+def cancel_sync(sync_id):
+    """Ask a running sync to stop at its next page or chunk boundary."""
+    frappe.has_permission("BioTime Device", "write", throw=True)
+    frappe.cache().set_value(CANCEL_KEY.format(sync_id), 1, expires_in_sec=CANCEL_TTL)
+    frappe.msgprint(f"Sync {sync_id} will stop after its current chunk.")
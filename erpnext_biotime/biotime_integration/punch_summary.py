@@ -0,0 +1,132 @@
+from collections import defaultdict
+
+import frappe
+from frappe.utils import add_days, get_datetime, getdate, now_datetime
+
+logger = frappe.logger("biotime", allow_site=True, file_count=50)
+
+SUMMARY_DOCTYPE = "BioTime Daily Punch Summary"
+SUMMARY_CHUNK_SIZE = 1000
+
+# One delta per (employee, date, device); rows sharing a name are applied one after another
+UPSERT_QUERY = """
+    INSERT INTO `tabBioTime Daily Punch Summary`
+        (name, owner, modified_by, creation, modified, docstatus, idx,
+         employee, employee_name, date, first_in, last_out, punch_count, devices)
+    VALUES {values}
+    ON DUPLICATE KEY UPDATE
+        first_in = IF(first_in IS NULL OR VALUES(first_in) < first_in, VALUES(first_in), first_in),
+        last_out = IF(last_out IS NULL OR VALUES(last_out) > last_out, VALUES(last_out), last_out),
+        punch_count = punch_count + VALUES(punch_count),
+        devices = IF(
+            VALUES(devices) = '' OR FIND_IN_SET(VALUES(devices), devices),
+            devices,
+            CONCAT_WS(',', NULLIF(devices, ''), VALUES(devices))
+        ),
+        modified = VALUES(modified)
+"""
+
+
+def get_summary_name(employee, date) -> str:
+    """Matches the doctype's `{employee}-{date}` naming."""
+    return f"{employee}-{getdate(date)}"
+
+
+def get_device_alias(checkin) -> str:
+    return (checkin.get("device_alias") or "").replace(",", " ")
+
+
+def update_daily_punch_summary(checkins, employee_names=None) -> None:
+    """
+    Merge newly inserted Employee Checkins into the daily summary, one upsert per
+    chunk, without reading the punches already summarized.
+    """
+    if not checkins:
+        return
+
+    employee_names = employee_names or {}
+    deltas = defaultdict(lambda: {"first_in": None, "last_out": None, "punch_count": 0})
+    for checkin in checkins:
+        punch_time = get_datetime(checkin["time"])
+        delta = deltas[(checkin["employee"], punch_time.date(), get_device_alias(checkin))]
+        delta["punch_count"] += 1
+        if checkin["log_type"] == "IN" and (not delta["first_in"] or punch_time < delta["first_in"]):
+            delta["first_in"] = punch_time
+        if checkin["log_type"] == "OUT" and (not delta["last_out"] or punch_time > delta["last_out"]):
+            delta["last_out"] = punch_time
+
+    now, user = now_datetime(), frappe.session.user
+    rows = [
+        (
+            get_summary_name(employee, date),
+            user,
+            user,
+            now,
+            now,
+            0,
+            0,
+            employee,
+            employee_names.get(employee),
+            date,
+            delta["first_in"],
+            delta["last_out"],
+            delta["punch_count"],
+            device,
+        )
+        for (employee, date, device), delta in deltas.items()
+    ]
+
+    for start in range(0, len(rows), SUMMARY_CHUNK_SIZE):
+        chunk = rows[start : start + SUMMARY_CHUNK_SIZE]
+        values = ", ".join(["(" + ", ".join(["%s"] * len(chunk[0])) + ")"] * len(chunk))
+        frappe.db.sql(UPSERT_QUERY.format(values=values), [value for row in chunk for value in row])
+
+
+def rebuild_daily_punch_summary(from_date, to_date) -> None:
+    """
+    Recompute the summary for a date range from Employee Checkin, e.g. after
+    checkins were deleted or edited, which the incremental updates do not see.
+    """
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    frappe.db.delete(SUMMARY_DOCTYPE, {"date": ["between", [from_date, to_date]]})
+    frappe.db.sql(
+        """
+        INSERT INTO `tabBioTime Daily Punch Summary`
+            (name, owner, modified_by, creation, modified, docstatus, idx,
+             employee, employee_name, date, first_in, last_out, punch_count, devices)
+        SELECT
+            CONCAT(checkin.employee, '-', DATE(checkin.time)), %(user)s, %(user)s, %(now)s, %(now)s, 0, 0,
+            checkin.employee, MAX(checkin.employee_name), DATE(checkin.time),
+            MIN(IF(checkin.log_type = 'IN', checkin.time, NULL)),
+            MAX(IF(checkin.log_type = 'OUT', checkin.time, NULL)),
+            COUNT(*),
+            GROUP_CONCAT(DISTINCT NULLIF(
+                REPLACE(SUBSTRING(checkin.device_id, LOCATE(' - ', checkin.device_id) + 3), ',', ' '), ''
+            ))
+        FROM `tabEmployee Checkin` checkin
+        WHERE checkin.time >= %(start)s AND checkin.time < %(end)s
+        GROUP BY checkin.employee, DATE(checkin.time)
+        """,
+        {
+            "start": from_date,
+            "end": add_days(to_date, 1),
+            "user": frappe.session.user,
+            "now": now_datetime(),
+        },
+    )
+    frappe.db.commit()
+    logger.info("Rebuilt the daily punch summary from %s to %s", from_date, to_date)
+
+
+@frappe.whitelist()
+def enqueue_summary_rebuild(from_date, to_date):
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        rebuild_daily_punch_summary,
+        queue="long",
+        timeout=24 * 60 * 60,
+        job_name="BioTime Daily Punch Summary Rebuild",
+        from_date=from_date,
+        to_date=to_date,
+    )
+    frappe.msgprint("Rebuilding the daily punch summary in the background.")
@@ -0,0 +1,208 @@
+import asyncio
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+
+import frappe
+import httpx
+import requests
+from frappe.utils import cint, flt
+
+logger = frappe.logger("biotime", allow_site=True, file_count=50)
+
+DEFAULT_REQUESTS_PER_SECOND = 5
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_MAX_RETRIES = 5
+
+BACKOFF_BASE = 1  # seconds
+BACKOFF_CAP = 60  # seconds
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Timeout of every request to a BioTime portal, blocking or asyncio
+REQUEST_TIMEOUT = 3000  # seconds
+# Slots held longer than this are treated as leaked by a crashed worker and reclaimed.
+# It must outlive the slowest request still running, or the limit is exceeded
+# exactly when the portal is slow.
+IN_FLIGHT_TTL = REQUEST_TIMEOUT + 60  # seconds
+POLL_INTERVAL = 0.05  # seconds
+
+# Token bucket refilled at `rate` tokens/sec up to `capacity`.
+# Returns 0 when a token was taken, otherwise the seconds to wait for the next one.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens < 1 then
+    wait = (1 - tokens) / rate
+else
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+# Counting semaphore stored as a sorted set of slot ids scored by acquire time
+IN_FLIGHT_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - ttl)
+if redis.call('ZCARD', KEYS[1]) < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ttl)
+    return 1
+end
+return 0
+"""
+
+
+def get_limits(connector) -> tuple[float, int]:
+    rate = flt(connector.get("requests_per_second")) or DEFAULT_REQUESTS_PER_SECOND
+    max_in_flight = cint(connector.get("max_in_flight")) or DEFAULT_MAX_IN_FLIGHT
+    return rate, max_in_flight
+
+
+def take_token(connector) -> float:
+    """Try to take a token from the connector's shared bucket; returns seconds to wait if empty."""
+    rate, _ = get_limits(connector)
+    key = frappe.cache().make_key(f"biotime:rate_limit:{connector.name}")
+    return float(frappe.cache().eval(TOKEN_BUCKET_SCRIPT, 1, key, rate, max(rate, 1), time.time()))
+
+
+def take_in_flight_slot(connector, slot) -> bool:
+    _, max_in_flight = get_limits(connector)
+    key = frappe.cache().make_key(f"biotime:in_flight:{connector.name}")
+    return bool(cint(frappe.cache().eval(IN_FLIGHT_SCRIPT, 1, key, max_in_flight, time.time(), IN_FLIGHT_TTL, slot)))
+
+
+def release_in_flight_slot(connector, slot) -> None:
+    frappe.cache().zrem(frappe.cache().make_key(f"biotime:in_flight:{connector.name}"), slot)
+
+
+def wait_for_token(connector) -> None:
+    """Block until the connector's shared token bucket grants a request."""
+    while wait := take_token(connector):
+        time.sleep(wait)
+
+
+@contextmanager
+def in_flight_slot(connector):
+    """Hold one of the connector's `max_in_flight` request slots, shared across workers."""
+    slot = uuid.uuid4().hex
+    while not take_in_flight_slot(connector, slot):
+        time.sleep(POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        release_in_flight_slot(connector, slot)
+
+
+async def async_wait_for_token(connector) -> None:
+    while wait := take_token(connector):
+        await asyncio.sleep(wait)
+
+
+@asynccontextmanager
+async def async_in_flight_slot(connector):
+    slot = uuid.uuid4().hex
+    while not take_in_flight_slot(connector, slot):
+        await asyncio.sleep(POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        release_in_flight_slot(connector, slot)
+
+
+def backoff_delay(attempt) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+
+
+def get_retry_after(response) -> float | None:
+    """Seconds to wait as requested by the server's `Retry-After` header, if any."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def biotime_request(connector, method, url, **kwargs) -> requests.Response:
+    """
+    Send a request to the connector's BioTime portal within its request budget.
+
+    Timeouts, connection errors and 429/5xx responses are retried with
+    exponential backoff and jitter, honouring `Retry-After` when present.
+    The last response (or exception) is returned (or raised) once retries run out.
+    """
+    max_retries = cint(connector.get("max_retries")) or DEFAULT_MAX_RETRIES
+    attempt = 0
+    while True:
+        wait_for_token(connector)
+        try:
+            with in_flight_slot(connector):
+                response = requests.request(method, url, **kwargs)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            if attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.error("Request to %s failed (%s), retrying in %.1fs (%d/%d)", url, e, delay, attempt + 1, max_retries)
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                return response
+            delay = get_retry_after(response)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            logger.error(
+                "Request to %s returned %d, retrying in %.1fs (%d/%d)",
+                url, response.status_code, delay, attempt + 1, max_retries,
+            )
+
+        time.sleep(delay)
+        attempt += 1
+
+
+async def async_biotime_request(client, connector, method, url, **kwargs):
+    """
+    Asyncio counterpart of `biotime_request` for an `httpx.AsyncClient`,
+    sharing the same per-connector budget and retry policy.
+    """
+    max_retries = cint(connector.get("max_retries")) or DEFAULT_MAX_RETRIES
+    attempt = 0
+    while True:
+        await async_wait_for_token(connector)
+        try:
+            async with async_in_flight_slot(connector):
+                response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.error("Request to %s failed (%s), retrying in %.1fs (%d/%d)", url, e, delay, attempt + 1, max_retries)
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                return response
+            delay = get_retry_after(response)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            logger.error(
+                "Request to %s returned %d, retrying in %.1fs (%d/%d)",
+                url, response.status_code, delay, attempt + 1, max_retries,
+            )
+
+        await asyncio.sleep(delay)
+        attempt += 1
@@ -0,0 +1,211 @@
+import asyncio
+from collections import defaultdict
+
+import frappe
+from frappe.utils import add_days, cint, getdate, today
+
+from erpnext_biotime.biotime_integration.async_client import get_connector, run_with_client
+from erpnext_biotime.biotime_integration.biotime_integration import get_enabled_connectors
+from erpnext_biotime.biotime_integration.cache import get_biotime_settings
+from erpnext_biotime.biotime_integration.replica import read_replica
+from erpnext_biotime.biotime_integration.sync_registry import request_sync
+
+logger = frappe.logger("biotime", allow_site=True, file_count=50)
+
+DEFAULT_AUDIT_DAYS = 3
+REPORT_KEY = "biotime:reconciliation_report"
+
+
+def get_day_range(day) -> tuple[str, str]:
+    return f"{day} 00:00:00", f"{day} 23:59:59"
+
+
+def get_audited_devices() -> list:
+    """BioTime Devices with an alias on an enabled connector, with the connector resolved."""
+    connectors = get_enabled_connectors()
+    if not connectors:
+        return []
+
+    devices = frappe.get_all(
+        "BioTime Device",
+        filters={"device_alias": ["is", "set"]},
+        fields=["name", "device_id", "device_alias", "device_sn", "biotime_connector"],
+    )
+    for device in devices:
+        device.biotime_connector = device.biotime_connector or connectors[0]
+    return [device for device in devices if device.biotime_connector in connectors]
+
+
+def get_portal_counts(devices, days) -> dict:
+    """
+    Punch count per (BioTime Device, day) according to the BioTime portal. Only the
+    `count` of a one row page is read for each bucket; buckets run concurrently.
+    """
+    counts = {}
+    devices_by_connector = defaultdict(list)
+    for device in devices:
+        devices_by_connector[device.biotime_connector].append(device)
+
+    for connector_name, connector_devices in devices_by_connector.items():
+        buckets = [(device, day) for device in connector_devices for day in days]
+
+        async def count_buckets(client, buckets=buckets):
+            return await asyncio.gather(
+                *(
+                    client.count_transactions(
+                        terminal_alias=device.device_alias,
+                        start_time=get_day_range(day)[0],
+                        end_time=get_day_range(day)[1],
+                    )
+                    for device, day in buckets
+                )
+            )
+
+        try:
+            bucket_keys = [(device.name, day) for device, day in buckets]
+            counts.update(zip(bucket_keys, run_with_client(get_connector(connector_name), count_buckets)))
+        except Exception as e:
+            logger.error("Reconciliation: could not count transactions on %s: %s", connector_name, str(e))
+
+    return counts
+
+
+def get_erpnext_counts(devices, days) -> dict:
+    """
+    Punch count per (BioTime Device, day) over Employee Checkin and BioTime Checkins.
+
+    Aliases are only unique within a portal, so BioTime Checkins are grouped by
+    (connector, alias) and Employee Checkins, stored as "<sn> - <alias>" without
+    a connector, by terminal serial number. Devices whose serial number is not
+    known yet fall back to the alias.
+    """
+    if not devices:
+        return {}
+
+    values = {"start": days[0], "end": add_days(days[-1], 1)}
+    with read_replica():
+        checkin_rows = frappe.db.sql(
+            """
+            SELECT
+                SUBSTRING_INDEX(device_id, ' - ', 1) AS device_sn,
+                SUBSTRING(device_id, LOCATE(' - ', device_id) + 3) AS device_alias,
+                DATE(time) AS day,
+                COUNT(*)
+            FROM `tabEmployee Checkin`
+            WHERE time >= %(start)s AND time < %(end)s
+            GROUP BY device_sn, device_alias, day
+            """,
+            values,
+        )
+        biotime_checkin_rows = frappe.db.sql(
+            """
+            SELECT biotime_connector, device_alias, DATE(time) AS day, COUNT(*)
+            FROM `tabBioTime Checkins`
+            WHERE time >= %(start)s AND time < %(end)s
+            GROUP BY biotime_connector, device_alias, day
+            """,
+            values,
+        )
+
+    by_sn, by_alias, by_connector_alias = defaultdict(int), defaultdict(int), defaultdict(int)
+    for device_sn, device_alias, day, count in checkin_rows:
+        by_sn[(device_sn, str(day))] += cint(count)
+        by_alias[(device_alias, str(day))] += cint(count)
+    default_connector = get_enabled_connectors()[0]
+    for connector, device_alias, day, count in biotime_checkin_rows:
+        # Rows synced before connectors were recorded belong to the first one, as devices do
+        by_connector_alias[(connector or default_connector, device_alias, str(day))] += cint(count)
+
+    return {
+        (device.name, day): (
+            by_sn[(device.device_sn, day)] if device.device_sn else by_alias[(device.device_alias, day)]
+        )
+        + by_connector_alias[(device.biotime_connector, device.device_alias, day)]
+        for device in devices
+        for day in days
+    }
+
+
+def reconcile(from_date, to_date, resync=False) -> list:
+    """
+    Compare punch counts per device per day between the portal and ERPNext and
+    return the buckets that differ, optionally enqueueing a sync of each bucket
+    with punches missing in ERPNext.
+
+    Punches collapsed by the de-bounce window or archived by the retention
+    policy show up as missing, so audit recent days and keep those in mind.
+    """
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    days = [str(add_days(from_date, offset)) for offset in range((to_date - from_date).days + 1)]
+    devices = get_audited_devices()
+
+    portal_counts = get_portal_counts(devices, days)
+    erpnext_counts = get_erpnext_counts(devices, days)
+
+    mismatches = []
+    for device in devices:
+        for day in days:
+            portal_count = portal_counts.get((device.name, day))
+            if portal_count is None:
+                continue
+            erpnext_count = erpnext_counts.get((device.name, day), 0)
+            if portal_count == erpnext_count:
+                continue
+
+            mismatch = frappe._dict(
+                device=device.name,
+                device_id=device.device_id,
+                device_alias=device.device_alias,
+                date=day,
+                portal_count=portal_count,
+                erpnext_count=erpnext_count,
+                difference=portal_count - erpnext_count,
+            )
+            if resync and mismatch.difference > 0:
+                mismatch.sync_id = request_sync(*get_day_range(day), device=device.name).sync_id
+            mismatches.append(mismatch)
+
+    frappe.cache().set_value(REPORT_KEY, {"from_date": str(from_date), "to_date": str(to_date), "mismatches": mismatches})
+    logger.info(
+        "Reconciliation %s to %s: %d of %d device days differ",
+        from_date,
+        to_date,
+        len(mismatches),
+        len(devices) * len(days),
+    )
+    for mismatch in mismatches:
+        logger.error(
+            "Reconciliation mismatch on %s (%s) for %s: portal %d, ERPNext %d",
+            mismatch.device_alias,
+            mismatch.device,
+            mismatch.date,
+            mismatch.portal_count,
+            mismatch.erpnext_count,
+        )
+    return mismatches
+
+
+def run_daily_reconciliation() -> None:
+    """Audit the configured number of days before today. Runs daily."""
+    settings = get_biotime_settings()
+    if not cint(settings.enable_reconciliation_audit):
+        return
+
+    days = cint(settings.reconciliation_days) or DEFAULT_AUDIT_DAYS
+    yesterday = add_days(today(), -1)
+    # Taps collapsed by de-bouncing are never inserted, so their buckets stay
+    # "missing" forever; resyncing them would re-download them every day for nothing
+    resync = cint(settings.auto_resync_mismatches) and not cint(settings.debounce_window_seconds)
+    reconcile(add_days(yesterday, 1 - days), yesterday, resync=resync)
+
+
+@frappe.whitelist()
+def run_reconciliation_audit(from_date, to_date, resync=0):
+    frappe.only_for("System Manager")
+    return reconcile(from_date, to_date, resync=cint(resync))
+
+
+@frappe.whitelist()
+def get_last_reconciliation_report():
+    frappe.only_for("System Manager")
+    return frappe.cache().get_value(REPORT_KEY)
@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+
+import frappe
+
+logger = frappe.logger("biotime", allow_site=True, file_count=50)
+
+
+@contextmanager
+def read_replica():
+    """
+    Run the reads in the block on the site's read replica (`read_from_replica`
+    in site config), falling back to the primary when none is configured or it
+    cannot be reached. Only for reads that may be a few seconds stale; never
+    write, lock or read your own uncommitted rows inside the block.
+
+    The replica connection is opened once per request or job and kept on
+    `frappe.local`; entering the block only swaps `frappe.local.db` over to it.
+    """
+    if not frappe.conf.read_from_replica or hasattr(frappe.local, "primary_db"):
+        # No replica configured, or already reading from it
+        yield
+        return
+
+    replica_db = get_replica_db()
+    if not replica_db:
+        yield
+        return
+
+    frappe.local.primary_db = frappe.local.db
+    frappe.local.db = replica_db
+    try:
+        yield
+    finally:
+        restore_primary()
+
+
+def get_replica_db():
+    """The replica connection of this request or job, connecting on first use. None if unreachable."""
+    replica_db = getattr(frappe.local, "biotime_replica_db", None)
+    if replica_db is not None:
+        return replica_db or None
+
+    try:
+        frappe.connect_replica()
+        replica_db = frappe.local.db
+        replica_db.sql("SELECT 1")
+    except Exception as e:
+        logger.error("Read replica unavailable, reading from the primary: %s", str(e))
+        if hasattr(frappe.local, "primary_db"):
+            try:
+                frappe.local.db.close()
+            except Exception:
+                pass
+        # Don't retry the connection for the rest of the request or job
+        replica_db = False
+    finally:
+        # connect_replica switches frappe.local.db itself; read_replica does the switching
+        if hasattr(frappe.local, "primary_db"):
+            frappe.local.db = frappe.local.primary_db
+            del frappe.local.primary_db
+
+    frappe.local.biotime_replica_db = replica_db
+    return replica_db or None
+
+
+def restore_primary() -> None:
+    primary_db = getattr(frappe.local, "primary_db", None)
+    if not primary_db:
+        return
+
+    frappe.local.db = primary_db
+    del frappe.local.primary_db
+
+
+def close_replica(*args, **kwargs) -> None:
+    """Close the request's or job's replica connection. Runs after every request and job."""
+    replica_db = getattr(frappe.local, "biotime_replica_db", None)
+    if not replica_db:
+        return
+
+    try:
+        replica_db.close()
+    except Exception:
+        pass
+    frappe.local.biotime_replica_db = None
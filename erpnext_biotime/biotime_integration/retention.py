@@ -0,0 +1,122 @@
+import gzip
+import io
+import json
+
+import frappe
+from frappe.utils import add_days, cint, now_datetime
+
+from erpnext_biotime.biotime_integration.cache import get_biotime_settings
+
+logger = frappe.logger("biotime", allow_site=True, file_count=50)
+
+ARCHIVE_DOCTYPE = "BioTime Checkins"
+SETTINGS_DOCTYPE = "BioTime Settings"
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def apply_retention_policy() -> None:
+    """
+    Archive BioTime Checkins older than the configured retention period.
+    Runs daily; does nothing unless data retention is enabled in BioTime Settings.
+    """
+    settings = get_biotime_settings()
+    if not cint(settings.enable_data_retention):
+        return
+
+    retention_days = cint(settings.biotime_checkins_retention_days)
+    if retention_days <= 0:
+        logger.error("Data retention is enabled but retention days is not set, skipping")
+        return
+
+    cutoff = add_days(now_datetime(), -retention_days)
+    archived = archive_biotime_checkins(cutoff, chunk_size=cint(settings.retention_chunk_size) or DEFAULT_CHUNK_SIZE)
+    logger.info("Retention run completed: archived %d biotime checkins older than %s", archived, cutoff)
+
+
+def archive_biotime_checkins(cutoff, chunk_size=DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Move BioTime Checkins older than `cutoff` into compressed JSONL files attached
+    to BioTime Settings, deleting them from the table chunk by chunk.
+
+    Each chunk is written and committed on its own, so an interrupted run
+    only leaves already-archived rows deleted and can simply be resumed.
+    """
+    archived = 0
+    while True:
+        rows = frappe.get_all(
+            ARCHIVE_DOCTYPE,
+            filters={"time": ["<", cutoff]},
+            fields=["*"],
+            order_by="time asc",
+            limit_page_length=chunk_size,
+        )
+        if not rows:
+            break
+
+        file_doc = save_archive_file(rows)
+        frappe.db.delete(ARCHIVE_DOCTYPE, {"name": ["in", [row.name for row in rows]]})
+        frappe.db.commit()
+
+        archived += len(rows)
+        logger.info("Archived %d biotime checkins to %s", len(rows), file_doc.file_name)
+
+    return archived
+
+
+def save_archive_file(rows):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as archive:
+        for row in rows:
+            archive.write((json.dumps(row, default=str) + "\n").encode())
+
+    file_name = "biotime_checkins_{0}_{1}.jsonl.gz".format(
+        rows[0].time.strftime("%Y%m%d%H%M%S"), rows[-1].time.strftime("%Y%m%d%H%M%S")
+    )
+    file_doc = frappe.get_doc(
+        {
+            "doctype": "File",
+            "file_name": file_name,
+            "attached_to_doctype": SETTINGS_DOCTYPE,
+            "attached_to_name": SETTINGS_DOCTYPE,
+            "is_private": 1,
+            "content": buffer.getvalue(),
+        }
+    )
+    file_doc.save(ignore_permissions=True)
+    return file_doc
+
+
+@frappe.whitelist()
+def enqueue_retention_run():
+    frappe.only_for("System Manager")
+    frappe.enqueue(apply_retention_policy, queue="long", job_name="BioTime Data Retention")
+    frappe.msgprint("Archiving old BioTime Checkins in the background.")
+
+
+@frappe.whitelist()
+def restore_biotime_checkins_archive(file_name) -> int:
+    """
+    Restore an archive file created by the retention engine back into BioTime Checkins.
+    Rows that already exist (e.g. a file restored twice) are skipped.
+    """
+    frappe.only_for("System Manager")
+
+    file_doc = frappe.get_doc("File", file_name)
+    if file_doc.attached_to_doctype != SETTINGS_DOCTYPE or not file_doc.file_name.endswith(".jsonl.gz"):
+        frappe.throw("{0} is not a BioTime Checkins archive".format(file_doc.file_name))
+
+    fields, values = None, []
+    with gzip.GzipFile(fileobj=io.BytesIO(file_doc.get_content()), mode="rb") as archive:
+        for line in archive:
+            row = json.loads(line)
+            if fields is None:
+                fields = list(row)
+            values.append(tuple(row.get(field) for field in fields))
+
+    if values:
+        frappe.db.bulk_insert(ARCHIVE_DOCTYPE, fields, values, ignore_duplicates=True)
+        frappe.db.commit()
+
+    logger.info("Restored %d biotime checkins from %s", len(values), file_doc.file_name)
+    frappe.msgprint("{0} BioTime Checkins restored from {1}".format(len(values), file_doc.file_name))
+    return len(values)
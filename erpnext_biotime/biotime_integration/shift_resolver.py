@@ -0,0 +1,143 @@
+from collections import defaultdict
+from datetime import timedelta
+
+import frappe
+from frappe.utils import add_days, cint, get_datetime, getdate
+
+from erpnext_biotime.biotime_integration.cache import get_biotime_settings, get_shift_type
+
+
+def is_enabled() -> bool:
+    return bool(cint(get_biotime_settings().batch_shift_resolution))
+
+
+class ShiftResolver:
+    """
+    Shift resolution for a batch of checkins, loading Employees, Shift Assignments
+    and Holidays for the batch's employees and date span once instead of per checkin.
+
+    `resolve` only answers when the outcome is clear cut: exactly one shift
+    window holds the punch and the day is not a holiday. Anything else returns
+    None and is left to HRMS' own per checkin validation.
+    """
+
+    def __init__(self, checkins):
+        self.employees = {}
+        self.assignments = defaultdict(list)
+        self.holidays = set()
+        self.company_holiday_lists = {}
+
+        times = [get_datetime(checkin["time"]) for checkin in checkins]
+        if not times:
+            return
+        # Overnight shifts and early check-ins reach into the neighbouring days
+        self.from_date = getdate(add_days(min(times).date(), -1))
+        self.to_date = getdate(add_days(max(times).date(), 1))
+        employee_names = list({checkin["employee"] for checkin in checkins})
+
+        self.load_employees(employee_names)
+        self.load_assignments(employee_names)
+        self.load_holidays()
+
+    def load_employees(self, employee_names):
+        for employee in frappe.get_all(
+            "Employee",
+            filters={"name": ["in", employee_names]},
+            fields=["name", "status", "default_shift", "holiday_list", "company"],
+        ):
+            self.employees[employee.name] = employee
+
+        companies = list({employee.company for employee in self.employees.values() if employee.company})
+        if companies:
+            self.company_holiday_lists = dict(
+                frappe.get_all(
+                    "Company",
+                    filters={"name": ["in", companies]},
+                    fields=["name", "default_holiday_list"],
+                    as_list=True,
+                )
+            )
+
+    def load_assignments(self, employee_names):
+        for assignment in frappe.get_all(
+            "Shift Assignment",
+            filters={
+                "employee": ["in", employee_names],
+                "docstatus": 1,
+                "status": "Active",
+                "start_date": ["<=", self.to_date],
+            },
+            or_filters=[["end_date", "is", "not set"], ["end_date", ">=", self.from_date]],
+            fields=["employee", "shift_type", "start_date", "end_date"],
+        ):
+            self.assignments[assignment.employee].append(assignment)
+
+    def load_holidays(self):
+        holiday_lists = {employee.holiday_list for employee in self.employees.values()}
+        holiday_lists |= set(self.company_holiday_lists.values())
+        shift_types = {assignment.shift_type for rows in self.assignments.values() for assignment in rows}
+        shift_types |= {employee.default_shift for employee in self.employees.values()}
+        holiday_lists |= {get_shift_type(shift_type).holiday_list for shift_type in shift_types if shift_type}
+        holiday_lists.discard(None)
+        if not holiday_lists:
+            return
+
+        for holiday in frappe.get_all(
+            "Holiday",
+            filters={
+                "parent": ["in", list(holiday_lists)],
+                "holiday_date": ["between", [self.from_date, self.to_date]],
+            },
+            fields=["parent", "holiday_date"],
+        ):
+            self.holidays.add((holiday.parent, getdate(holiday.holiday_date)))
+
+    def get_shift_types_on(self, employee, date) -> list:
+        """Shift Types assigned to the employee on a date, else the default shift."""
+        shift_types = [
+            assignment.shift_type
+            for assignment in self.assignments.get(employee.name, [])
+            if getdate(assignment.start_date) <= date and (not assignment.end_date or date <= getdate(assignment.end_date))
+        ]
+        if not shift_types and employee.default_shift:
+            shift_types = [employee.default_shift]
+        return shift_types
+
+    def is_holiday(self, employee, shift, date) -> bool:
+        holiday_list = (
+            shift.holiday_list or employee.holiday_list or self.company_holiday_lists.get(employee.company)
+        )
+        return bool(holiday_list) and (holiday_list, date) in self.holidays
+
+    def get_window(self, shift, date) -> frappe._dict:
+        start = get_datetime(f"{date} {shift.start_time}")
+        end = get_datetime(f"{date} {shift.end_time}")
+        if end <= start:
+            end += timedelta(days=1)
+        return frappe._dict(
+            shift=shift.name,
+            shift_start=start,
+            shift_end=end,
+            shift_actual_start=start - timedelta(minutes=cint(shift.begin_check_in_before_shift_start_time)),
+            shift_actual_end=end + timedelta(minutes=cint(shift.allow_check_out_after_shift_end_time)),
+        )
+
+    def resolve(self, checkin) -> frappe._dict | None:
+        """The shift fields to stamp on a checkin, or None to let HRMS resolve it."""
+        employee = self.employees.get(checkin["employee"])
+        if not employee or employee.status != "Active":
+            return None
+
+        punch_time = get_datetime(checkin["time"])
+        matches = []
+        for offset in (-1, 0, 1):
+            date = getdate(add_days(punch_time.date(), offset))
+            for shift_type in self.get_shift_types_on(employee, date):
+                shift = get_shift_type(shift_type)
+                window = self.get_window(shift, date)
+                if window.shift_actual_start <= punch_time <= window.shift_actual_end:
+                    if self.is_holiday(employee, shift, date):
+                        return None
+                    matches.append(window)
+
+        return matches[0] if len(matches) == 1 else None
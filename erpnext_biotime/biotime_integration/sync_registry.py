@@ -0,0 +1,215 @@
+import json
+
+import frappe
+from frappe.utils import cint, get_datetime, now_datetime
+
+from erpnext_biotime.biotime_integration.progress import SyncCancelled, SyncProgress
+
+logger = frappe.logger("biotime", allow_site=True, file_count=50)
+
+REGISTRY_KEY = "biotime:sync_registry"
+REGISTRY_LOCK_TIMEOUT = 10  # seconds
+
+# How long a completed run keeps satisfying new requests for its range
+COVERAGE_TTL = 6 * 60 * 60  # seconds
+# Queued or running entries older than this are assumed lost with their worker
+STALE_AFTER = 24 * 60 * 60  # seconds
+
+DEVICE_SYNC_METHOD = "erpnext_biotime.erpnext_biotime.doctype.biotime_device.biotime_device.manual_sync_transactions_by_date_range"
+FULL_SYNC_METHOD = "erpnext_biotime.erpnext_biotime.doctype.biotime_device.biotime_device.manual_sync_all_transactions"
+
+
+def registry_lock():
+    return frappe.cache().lock(
+        frappe.cache().make_key(f"{REGISTRY_KEY}:lock"),
+        timeout=REGISTRY_LOCK_TIMEOUT,
+        blocking_timeout=REGISTRY_LOCK_TIMEOUT,
+    )
+
+
+def get_entries() -> dict:
+    """Registered syncs by id, without expired and stale ones."""
+    now = now_datetime()
+    entries = {}
+    for sync_id, value in (frappe.cache().hgetall(REGISTRY_KEY) or {}).items():
+        entry = frappe._dict(json.loads(value))
+        if "device_id" in entry:
+            # Written before devices were named per connector; its device cannot be resolved
+            frappe.cache().hdel(REGISTRY_KEY, sync_id)
+            continue
+        age = (now - get_datetime(entry.finished_at or entry.created)).total_seconds()
+        if (entry.status == "finished" and age > COVERAGE_TTL) or (
+            entry.status in ("queued", "running") and age > STALE_AFTER
+        ):
+            frappe.cache().hdel(REGISTRY_KEY, sync_id)
+            continue
+        entries[frappe.safe_decode(sync_id)] = entry
+    return entries
+
+
+def get_entry(sync_id):
+    value = frappe.cache().hget(REGISTRY_KEY, sync_id)
+    return frappe._dict(json.loads(value)) if value else None
+
+
+def save_entry(entry) -> None:
+    frappe.cache().hset(REGISTRY_KEY, entry.sync_id, json.dumps(entry, default=str))
+
+
+def update_entry(sync_id, **values) -> None:
+    with registry_lock():
+        if entry := get_entry(sync_id):
+            entry.update(values)
+            save_entry(entry)
+
+
+def scope_covers(entry, device, emp_code, replay) -> bool:
+    """Whether the entry's device and employee filters include the request's (empty filter = all)."""
+    return (
+        cint(entry.replay) == cint(replay)
+        and entry.device in (None, device)
+        and entry.emp_code in (None, emp_code)
+    )
+
+
+def get_covered_until(entry):
+    """End of the range an entry fetches: punches after a run started may not be in it."""
+    if entry.started_at:
+        return min(get_datetime(entry.end), get_datetime(entry.started_at))
+    return get_datetime(entry.end)
+
+
+def request_sync(start, end, device=None, emp_code=None, replay=0) -> frappe._dict:
+    """
+    Register a manual sync of [start, end] for a BioTime Device (by name, or all devices) and
+    employee (or everyone), coalescing it with syncs already registered:
+
+    - a queued, running or recently finished sync whose scope and range cover
+      the request is reused,
+    - a queued sync with the same scope and an overlapping range is widened
+      to the union of both ranges,
+    - otherwise the part of the range not yet covered is enqueued as a new sync.
+
+    A replay (`replay=1`) re-reads the raw pages cached for exactly the requested
+    query, usually to re-run an insert after a fix, so it is always enqueued as
+    requested: it is never covered, merged or trimmed.
+
+    Returns `{"sync_id", "status"}` where status is "covered", "merged" or "queued".
+    """
+    start, end = get_datetime(start), get_datetime(end)
+    device, emp_code, replay = device or None, emp_code or None, cint(replay)
+
+    with registry_lock():
+        entries = get_entries()
+        covering = [entry for entry in entries.values() if scope_covers(entry, device, emp_code, replay)]
+        if replay:
+            covering = []
+
+        for entry in covering:
+            if get_datetime(entry.start) <= start and end <= get_covered_until(entry):
+                return frappe._dict(sync_id=entry.sync_id, status="covered")
+
+        for entry in covering:
+            same_scope = (entry.device, entry.emp_code) == (device, emp_code)
+            overlaps = get_datetime(entry.start) <= end and start <= get_datetime(entry.end)
+            if entry.status == "queued" and same_scope and overlaps:
+                entry.start = min(get_datetime(entry.start), start)
+                entry.end = max(get_datetime(entry.end), end)
+                save_entry(entry)
+                return frappe._dict(sync_id=entry.sync_id, status="merged")
+
+        # Trim the ends already covered by other syncs
+        for entry in covering:
+            entry_start, covered_until = get_datetime(entry.start), get_covered_until(entry)
+            if entry_start <= start <= covered_until:
+                start = covered_until
+            if entry_start <= end <= covered_until:
+                end = entry_start
+            if start >= end:
+                return frappe._dict(sync_id=entry.sync_id, status="covered")
+
+        entry = frappe._dict(
+            sync_id=frappe.generate_hash(length=12),
+            device=device,
+            emp_code=emp_code,
+            replay=replay,
+            start=start,
+            end=end,
+            status="queued",
+            user=frappe.session.user,
+            created=now_datetime(),
+        )
+        save_entry(entry)
+
+    # Enqueued right away rather than after commit: the entry is already in Redis,
+    # and a rolled back request must not leave it covering a range nothing syncs.
+    try:
+        frappe.enqueue(
+            run_registered_sync,
+            queue="long",
+            job_name=f"BioTime Sync {entry.sync_id}",
+            sync_id=entry.sync_id,
+        )
+    except Exception:
+        with registry_lock():
+            frappe.cache().hdel(REGISTRY_KEY, entry.sync_id)
+        raise
+    return frappe._dict(sync_id=entry.sync_id, status="queued")
+
+
+def get_sync_title(entry) -> str:
+    scope = entry.device and f"device {entry.device}" or entry.emp_code or "all devices"
+    return f"BioTime Sync: {scope}, {entry.start} to {entry.end}"
+
+
+def run_registered_sync(sync_id) -> None:
+    """
+    Run a registered sync with the range it holds when it starts, which merges may have widened.
+    Progress is published under the sync id; a cancelled sync stops at its next page or chunk.
+
+    The sync methods raise when any connector failed; only a sync that completed on
+    every connector is marked finished and keeps covering its range.
+    """
+    with registry_lock():
+        entry = get_entry(sync_id)
+        if not entry:
+            logger.error("Sync %s is no longer registered, skipping", sync_id)
+            return
+        entry.update(status="running", started_at=now_datetime())
+        save_entry(entry)
+
+    progress = SyncProgress(sync_id, get_sync_title(entry))
+    try:
+        progress.check_cancelled()
+        if entry.device:
+            frappe.get_attr(DEVICE_SYNC_METHOD)(
+                entry.start, entry.end, entry.device, replay=entry.replay, progress=progress
+            )
+        else:
+            frappe.get_attr(FULL_SYNC_METHOD)(
+                entry.start, entry.end, emp_code=entry.emp_code, replay=entry.replay, progress=progress
+            )
+    except SyncCancelled:
+        # Chunks inserted so far are kept; the range is no longer covered
+        with registry_lock():
+            frappe.cache().hdel(REGISTRY_KEY, sync_id)
+        progress.finish("cancelled", "Sync cancelled")
+        logger.info("Sync %s was cancelled", sync_id)
+        return
+    except Exception as e:
+        with registry_lock():
+            frappe.cache().hdel(REGISTRY_KEY, sync_id)
+        progress.finish("failed", str(e))
+        raise
+
+    update_entry(sync_id, status="finished", finished_at=now_datetime())
+    progress.finish()
+
+
+def get_sync_message(result) -> str:
+    if result.status == "covered":
+        return f"These transactions are already being synced or were just synced (sync {result.sync_id})."
+    if result.status == "merged":
+        return f"Your range was added to a sync that is already queued (sync {result.sync_id})."
+    return f"Syncing the transactions in processing (sync {result.sync_id}); It may take a few seconds."
+
@@ -0,0 +1,200 @@
+import json
+import sys
+from itertools import groupby
+
+import frappe
+from frappe.utils import cint, get_datetime
+
+from erpnext_biotime.biotime_integration.cache import get_biotime_settings
+
+logger = frappe.logger("biotime", allow_site=True, file_count=50)
+
+
+def intern_str(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class BioTimeTransaction:
+    """
+    A single punch on its way from the BioTime API to Employee Checkin or BioTime Checkins.
+
+    Slotted so large backfills stay small in memory; repeated strings (names,
+    department, position, device) are interned and shared between rows.
+    Supports `record["field"]` and `record.get("field")` like the dicts it replaces.
+    """
+
+    __slots__ = (
+        "transaction_id",
+        "employee",
+        "biotime_employee_code",
+        "first_name",
+        "last_name",
+        "department",
+        "position",
+        "device_sn",
+        "device_alias",
+        "log_type",
+        "time",
+        "biotime_connector",
+    )
+
+    def __init__(self, **kwargs):
+        for field in self.__slots__:
+            setattr(self, field, kwargs.get(field))
+
+    @classmethod
+    def from_api(cls, transaction, employee=None, connector_name=None):
+        return cls(
+            transaction_id=transaction.get("id"),
+            employee=employee,
+            biotime_employee_code=None if employee else intern_str(transaction["emp_code"]),
+            first_name=intern_str(transaction["first_name"]),
+            last_name=intern_str(transaction["last_name"]),
+            department=intern_str(transaction["department"]),
+            position=intern_str(transaction["position"]),
+            device_sn=intern_str(transaction["terminal_sn"]),
+            device_alias=intern_str(transaction["terminal_alias"]),
+            log_type="IN" if transaction["punch_state_display"] == "Check In" else "OUT",
+            time=transaction["punch_time"],
+            biotime_connector=connector_name,
+        )
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def as_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f"BioTimeTransaction({self.employee or self.biotime_employee_code}, {self.log_type}, {self.time})"
+
+
+def get_employees_by_device_code(codes) -> dict:
+    """Map BioTime employee codes to Employee names with one query per batch."""
+    codes = {code for code in codes if code}
+    if not codes:
+        return {}
+
+    return {
+        employee.attendance_device_id: intern_str(employee.name)
+        for employee in frappe.get_all(
+            "Employee",
+            filters={"attendance_device_id": ["in", list(codes)]},
+            fields=["name", "attendance_device_id"],
+        )
+    }
+
+
+def get_employee_device_code(emp_code) -> str:
+    """
+    BioTime employee code for an Employee docname (its Attendance Device ID);
+    anything that is not an Employee is taken to be a BioTime code already.
+    """
+    if not frappe.db.exists("Employee", emp_code):
+        return emp_code
+
+    device_code = frappe.db.get_value("Employee", emp_code, "attendance_device_id")
+    if not device_code:
+        frappe.throw(f"Employee {emp_code} has no Attendance Device ID")
+    return device_code
+
+
+def split_transactions(transactions, connector_name) -> tuple[list, list]:
+    """
+    Map BioTime transactions to Employee Checkin records, or to BioTime Checkins
+    records when the employee is not found in ERPNext.
+    """
+    employees = get_employees_by_device_code(transaction["emp_code"] for transaction in transactions)
+
+    checkins, biotime_checkins = [], []
+    for transaction in transactions:
+        employee = employees.get(transaction["emp_code"])
+        record = BioTimeTransaction.from_api(transaction, employee, connector_name)
+        # Employee not found in ERPNext, save the transaction in a separate Checkin Log
+        (checkins if employee else biotime_checkins).append(record)
+
+    return checkins, biotime_checkins
+
+
+def split_transaction_pages(pages, connector_name) -> tuple[list, list]:
+    """
+    Like `split_transactions`, for raw JSON page bodies. Each page is parsed only
+    when it is reached and released right after, so at most one parsed page is held.
+    """
+    checkins, biotime_checkins = [], []
+    pages.reverse()
+    while pages:
+        page_checkins, page_biotime_checkins = split_transactions(json.loads(pages.pop())["data"], connector_name)
+        checkins.extend(page_checkins)
+        biotime_checkins.extend(page_biotime_checkins)
+
+    return checkins, biotime_checkins
+
+
+def debounce_transactions(records, window_seconds) -> tuple[list, dict]:
+    """
+    Collapse bursts of punches by the same person: punches within `window_seconds`
+    of a burst's first punch belong to that burst, of which only the first IN and
+    the last OUT are kept.
+
+    Returns the kept records and counts of what was received, kept and collapsed.
+    Bursts split across two separate fetches are not merged.
+    """
+    stats = {"received": len(records), "kept": len(records), "collapsed": 0}
+    if window_seconds <= 0 or len(records) < 2:
+        return records, stats
+
+    def person(record):
+        return (record.biotime_connector or "", record.employee or "", record.biotime_employee_code or "")
+
+    timed = sorted(((person(record), get_datetime(record.time), record) for record in records), key=lambda row: row[:2])
+
+    kept = []
+    for _person, rows in groupby(timed, key=lambda row: row[0]):
+        burst, burst_start = [], None
+        for _key, punch_time, record in rows:
+            if burst and (punch_time - burst_start).total_seconds() > window_seconds:
+                kept.extend(collapse_burst(burst))
+                burst = []
+            if not burst:
+                burst_start = punch_time
+            burst.append(record)
+        kept.extend(collapse_burst(burst))
+
+    stats["kept"] = len(kept)
+    stats["collapsed"] = stats["received"] - stats["kept"]
+    return kept, stats
+
+
+def collapse_burst(burst) -> list:
+    if len(burst) == 1:
+        return burst
+
+    first_in = next((record for record in burst if record.log_type == "IN"), None)
+    last_out = next((record for record in reversed(burst) if record.log_type == "OUT"), None)
+    return [record for record in (first_in, last_out) if record]
+
+
+def debounce_checkins(checkins, biotime_checkins) -> tuple[list, list]:
+    """Apply the de-bounce window from BioTime Settings to both checkin lists."""
+    window_seconds = cint(get_biotime_settings().debounce_window_seconds)
+    if window_seconds <= 0:
+        return checkins, biotime_checkins
+
+    checkins, checkin_stats = debounce_transactions(checkins, window_seconds)
+    biotime_checkins, biotime_checkin_stats = debounce_transactions(biotime_checkins, window_seconds)
+    logger.info(
+        "De-bounce (%ss): kept %d of %d employee checkins, %d of %d biotime checkins",
+        window_seconds,
+        checkin_stats["kept"],
+        checkin_stats["received"],
+        biotime_checkin_stats["kept"],
+        biotime_checkin_stats["received"],
+    )
+    return checkins, biotime_checkins
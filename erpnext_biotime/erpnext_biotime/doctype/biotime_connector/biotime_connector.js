@@ -8,11 +8,12 @@ frappe.ui.form.on('BioTime Connector', {
   add_sync_devices_button: function(frm) {
     frm.add_custom_button(__('Sync Devices'), function() {
             frappe.call({
-                method: 'erpnext_biotime.biotime_integration.biotime_integration.fetch_and_create_devices',
+                method: 'erpnext_biotime.erpnext_biotime.doctype.biotime_connector.biotime_connector.enqueue_device_sync',
+                args: {
+                    connector: frm.doc.name
+                },
                 callback: function(response) {
-                    if (response.message) {
-                        frappe.msgprint(response.message);
-                    }
+                    erpnext_biotime.track_sync_progress(response.message, __("Syncing Devices"));
                 }
             });
         }, __("Manage"));
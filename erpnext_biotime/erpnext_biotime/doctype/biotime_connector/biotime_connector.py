@@ -1,8 +1,39 @@
 # Copyright (c) 2023, Axentor and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
+from erpnext_biotime.biotime_integration.async_client import get_connector
+from erpnext_biotime.biotime_integration.biotime_integration import create_devices
+from erpnext_biotime.biotime_integration.progress import SyncCancelled, SyncProgress
 
 class BioTimeConnector(Document):
 	pass
+
+
+def run_device_sync(connector, sync_id):
+	progress = SyncProgress(sync_id, f"BioTime Devices: {connector}")
+	try:
+		created = create_devices(get_connector(connector), progress=progress)
+	except SyncCancelled:
+		progress.finish("cancelled", "Sync cancelled")
+		return
+	except Exception as e:
+		progress.finish("failed", str(e))
+		raise
+	progress.finish(message=f"{created} new device(s) created")
+
+
+@frappe.whitelist()
+def enqueue_device_sync(connector):
+	frappe.has_permission("BioTime Device", "create", throw=True)
+
+	sync_id = frappe.generate_hash(length=12)
+	frappe.enqueue(
+		run_device_sync,
+		queue="long",
+		job_name=f"BioTime Device Sync {sync_id}",
+		connector=connector,
+		sync_id=sync_id,
+	)
+	return sync_id
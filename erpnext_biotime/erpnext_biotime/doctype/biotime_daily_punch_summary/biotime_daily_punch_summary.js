@@ -0,0 +1,8 @@
+// Copyright (c) 2026, Axentor and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on('BioTime Daily Punch Summary', {
+	// refresh: function(frm) {
+
+	// }
+});
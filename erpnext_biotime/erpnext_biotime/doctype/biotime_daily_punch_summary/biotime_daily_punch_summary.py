@@ -0,0 +1,13 @@
+# Copyright (c) 2026, Axentor and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class BioTimeDailyPunchSummary(Document):
+    pass
+
+
+def on_doctype_update():
+    frappe.db.add_index("BioTime Daily Punch Summary", ["date", "employee"])
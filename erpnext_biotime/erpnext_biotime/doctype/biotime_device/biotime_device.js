@@ -33,6 +33,12 @@ frappe.ui.form.on('BioTime Device', {
                     fieldname: "end_date",
                     fieldtype: "Datetime",
                     reqd: 1
+                },
+                {
+                    label: __("Replay From Cache"),
+                    fieldname: "replay",
+                    fieldtype: "Check",
+                    description: __("Re-process previously downloaded pages without calling the BioTime portal")
                 }
             ],
             primary_action_label: __("Fetch Transactions"),
@@ -50,11 +56,16 @@ frappe.ui.form.on('BioTime Device', {
                     args: { 
                         start_date: start_date,
                         end_date: end_date,
-                        device_id:device_id
+                        device_id:device_id,
+                        connector: frm.doc.biotime_connector,
+                        replay: values.replay || 0
                     },
                     callback: function(response) {
+                        // The server reports whether a new sync was queued or an existing one reused
                         if (response.message) {
-                            frappe.msgprint(response.message);
+                            if (response.message.status !== "covered") {
+                                erpnext_biotime.track_sync_progress(response.message.sync_id, __("Syncing {0}", [frm.doc.device_name || device_id]));
+                            }
                             frm.refresh();
                         }
                     }
@@ -73,7 +84,8 @@ frappe.ui.form.on('BioTime Device', {
       frappe.call({
                 method: 'erpnext_biotime.biotime_integration.biotime_integration.fetch_and_create_devices',
                 args: {
-                    device_id: device_id
+                    device_id: device_id,
+                    connector: frm.doc.biotime_connector || null
                 },
                 callback: function(response) {
                     if (response.message) {
@@ -82,10 +94,12 @@ frappe.ui.form.on('BioTime Device', {
                         frm.set_value('device_id', deviceData.device_id);
                         frm.set_value('device_name', deviceData.device_name);
                         frm.set_value('device_alias', deviceData.device_alias);
+                        frm.set_value('device_sn', deviceData.device_sn);
                         frm.set_value('device_ip_address', deviceData.device_ip_address);
                         frm.set_value('device_area', deviceData.last_activity);
                         frm.set_value('last_activity', deviceData.last_sync_request);
                         frm.set_value('last_sync_request', deviceData.device_area);
+                        frm.set_value('biotime_connector', deviceData.biotime_connector);
                     }
                 }
             });
@@ -3,26 +3,50 @@
 
 import frappe
 from frappe.model.document import Document
-from erpnext_biotime.biotime_integration.biotime_integration import insert_bulk_biotime_checkins
+from frappe.utils import cint
 from erpnext_biotime.biotime_integration.biotime_integration import fetch_transactions
-from erpnext_biotime.biotime_integration.biotime_integration import insert_bulk_checkins
+from erpnext_biotime.biotime_integration.biotime_integration import ingest_in_chunks
+from erpnext_biotime.biotime_integration.biotime_integration import insert_bulk_biotime_checkins, insert_bulk_checkins
+from erpnext_biotime.biotime_integration.biotime_integration import get_enabled_connectors
+from erpnext_biotime.biotime_integration.async_client import fetch_transaction_pages, get_connector
+from erpnext_biotime.biotime_integration.progress import SyncCancelled
+from erpnext_biotime.biotime_integration.sync_registry import get_sync_message, request_sync
+from erpnext_biotime.biotime_integration.transactions import debounce_checkins, get_employee_device_code, split_transaction_pages
+from erpnext_biotime.overrides.employee_checkin import recompute_employee_attendance
 
 logger = frappe.logger("biotime", allow_site=True, file_count=50)
 class BioTimeDevice(Document):
     pass
 
-def manual_sync_transactions_by_date_range(start_date, end_date, device_id) -> None:
+def get_device_name(device_id, connector=None) -> str:
+    """BioTime Device for a portal terminal id; ids are only unique per connector."""
+    filters = {"device_id": device_id}
+    if connector:
+        filters["biotime_connector"] = connector
+    devices = frappe.get_all("BioTime Device", filters=filters, pluck="name", limit=2)
+    if not devices:
+        frappe.throw(f"BioTime Device {device_id} not found")
+    if len(devices) > 1:
+        frappe.throw(f"Device ID {device_id} exists on several connectors, please pick the connector")
+    return devices[0]
+
+
+def manual_sync_transactions_by_date_range(start_date, end_date, device, replay=False, progress=None) -> None:
+    """Sync one BioTime Device, given by name, from its own connector."""
     page_size = 1000
-    terminal_alias = frappe.db.get_value("BioTime Device", {"device_id": device_id}, "device_alias")
+    device_id, terminal_alias, connector = frappe.db.get_value(
+        "BioTime Device", device, ["device_id", "device_alias", "biotime_connector"]
+    ) or (None, None, None)
 
     if not terminal_alias:
-        return f"Device ID {device_id} has no device_alias "
+        raise Exception(f"Device {device} has no device_alias")
 
     all_checkins = []
     all_biotime_checkins = []
 
     device_checkins, biotime_checkins = fetch_transactions(
-        start_time=start_date, end_time=end_date, terminal_alias=terminal_alias, page_size=page_size
+        start_time=start_date, end_time=end_date, terminal_alias=terminal_alias, page_size=page_size, connector=connector,
+        replay=cint(replay), progress=progress,
     )
     
     
@@ -34,47 +58,120 @@ def manual_sync_transactions_by_date_range(start_date, end_date, device_id) -> N
     all_checkins.extend(device_checkins)
     all_biotime_checkins.extend(biotime_checkins)
 
-    insert_bulk_checkins(all_checkins)
-    insert_bulk_biotime_checkins(all_biotime_checkins)
+    ingest_in_chunks(all_checkins, all_biotime_checkins, progress)
 
 
-def manual_sync_all_transactions(start_time,end_time,emp_code=None) -> None:
+def manual_sync_all_transactions(start_time,end_time,emp_code=None,replay=False,progress=None) -> None:
+    if emp_code:
+        return manual_sync_employee_transactions(start_time, end_time, emp_code, replay=replay, progress=progress)
+
     page_size=1000
+    failed_connectors = []
  
-    try:
-
-        device_checkins, biotime_checkins = fetch_transactions(
-            start_time=start_time, end_time=end_time,emp_code=emp_code,page_size=page_size)
+    for connector in get_enabled_connectors():
+        try:
+
+            if cint(replay):
+                # Re-run transform and insert from the raw page cache only
+                device_checkins, biotime_checkins = fetch_transactions(
+                    start_time=start_time, end_time=end_time, emp_code=emp_code, page_size=page_size,
+                    connector=connector, replay=True, progress=progress,
+                )
+            else:
+                # All pages are fetched concurrently
+                pages = fetch_transaction_pages(
+                    get_connector(connector), progress=progress,
+                    start_time=start_time, end_time=end_time, emp_code=emp_code, page_size=page_size
+                )
+                device_checkins, biotime_checkins = debounce_checkins(*split_transaction_pages(pages, connector))
+
+            logger.error(f"Synced {len(device_checkins)} checkins from {start_time} to {end_time} on {connector}")
+
+            ingest_in_chunks(device_checkins, biotime_checkins, progress)
+
+        except SyncCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Error syncing transactions on {connector}: {str(e)}")
+            failed_connectors.append(connector)
+
+    raise_for_failed_connectors(failed_connectors)
+
+
+def raise_for_failed_connectors(failed_connectors) -> None:
+    """
+    Fail the sync once every connector had its turn, so the sync registry drops
+    the run instead of treating its range as covered.
+    """
+    if failed_connectors:
+        raise Exception(f"Syncing transactions failed on {', '.join(failed_connectors)}")
+
+
+def manual_sync_employee_transactions(start_time, end_time, emp_code, replay=False, progress=None) -> None:
+    """
+    Fetch only one employee's punches for the range, upsert them without marking
+    attendance per punch, then recompute each affected shift window once.
+    `emp_code` is an Employee docname or a BioTime employee code.
+    """
+    device_code = get_employee_device_code(emp_code)
+    checkins, biotime_checkins = [], []
+    failed_connectors = []
+
+    for connector in get_enabled_connectors():
+        try:
+            if cint(replay):
+                connector_checkins, connector_biotime_checkins = fetch_transactions(
+                    start_time=start_time, end_time=end_time, emp_code=device_code, page_size=1000,
+                    connector=connector, replay=True, progress=progress,
+                )
+            else:
+                pages = fetch_transaction_pages(
+                    get_connector(connector), progress=progress,
+                    start_time=start_time, end_time=end_time, emp_code=device_code, page_size=1000
+                )
+                connector_checkins, connector_biotime_checkins = debounce_checkins(*split_transaction_pages(pages, connector))
+        except SyncCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Error syncing transactions of {device_code} on {connector}: {str(e)}")
+            failed_connectors.append(connector)
+            continue
+
+        checkins.extend(connector_checkins)
+        biotime_checkins.extend(connector_biotime_checkins)
+
+    logger.info(f"Resyncing {len(checkins)} checkins of {device_code} from {start_time} to {end_time}")
+
+    # One employee: inserted inline, never sharded over ingest workers
+    insert_bulk_checkins(checkins, skip_attendance_update=True)
+    insert_bulk_biotime_checkins(biotime_checkins)
+    # Windows are recomputed and committed one by one under their attendance locks
+    frappe.db.commit()
+
+    for employee in {checkin["employee"] for checkin in checkins} or [emp_code]:
+        if frappe.db.exists("Employee", employee):
+            windows = recompute_employee_attendance(employee, start_time, end_time)
+            logger.info(f"Recomputed attendance of {employee} for {windows} shift windows")
+
+    raise_for_failed_connectors(failed_connectors)
 
-        logger.error(f"Synced {len(device_checkins)} checkins from {start_time} to {end_time}") 
-        
-        insert_bulk_checkins(device_checkins)
-        insert_bulk_biotime_checkins(biotime_checkins)
 
-    except Exception as e:
-        logger.error(f"Error syncing transactions: {str(e)}")
+@frappe.whitelist()
+def resync_employee(employee, start_time, end_time, replay=0):
+    """Queue a resync of one employee's punches and attendance for the range."""
+    get_employee_device_code(employee)
+    return enqueu_all_sync(start_time, end_time, emp_code=employee, replay=replay)
 
 
 @frappe.whitelist()
-def enqueu_manual_sync(start_date, end_date, device_id):
-    frappe.enqueue(
-        manual_sync_transactions_by_date_range,
-        queue="long",
-        job_name="Manual Biotime Device Sync",
-        start_date=start_date,
-        end_date=end_date,
-        device_id=device_id,
-    )
-
-    frappe.msgprint("Syncing the transactions in processing; It may take a few seconds.")
+def enqueu_manual_sync(start_date, end_date, device_id, replay=0, connector=None):
+    device = get_device_name(device_id, connector)
+    result = request_sync(start_date, end_date, device=device, replay=replay)
+    frappe.msgprint(get_sync_message(result))
+    return result
 
 @frappe.whitelist()
-def enqueu_all_sync(start_time, end_time, emp_code=None):
-    frappe.enqueue(manual_sync_all_transactions,
-        queue="long",
-        job_name="Manual Full Sync",
-        start_time=start_time,   
-        end_time=end_time,       
-        emp_code=emp_code  )
-    
-    frappe.msgprint("Syncing the transactions in processing; It may take a few seconds.")
\ No newline at end of file
+def enqueu_all_sync(start_time, end_time, emp_code=None, replay=0):
+    result = request_sync(start_time, end_time, emp_code=emp_code, replay=replay)
+    frappe.msgprint(get_sync_message(result))
+    return result
\ No newline at end of file
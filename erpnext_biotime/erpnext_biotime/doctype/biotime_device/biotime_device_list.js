@@ -22,6 +22,12 @@ frappe.listview_settings['BioTime Device'] = {
                         fieldname: "emp_code",
                         fieldtype: "Link",
                         options:"Employee"
+                    },
+                    {
+                        label: __("Replay From Cache"),
+                        fieldname: "replay",
+                        fieldtype: "Check",
+                        description: __("Re-process previously downloaded pages without calling the BioTime portal")
                     }
                 ],
                 primary_action_label: __("Fetch Transactions"),
@@ -48,12 +54,12 @@ frappe.listview_settings['BioTime Device'] = {
                         args: {
                             start_time: data.start_time,
                             end_time: data.end_time || null,
-                            emp_code: data.emp_code || null
-
+                            emp_code: data.emp_code || null,
+                            replay: data.replay || 0
                         },
                         callback: function(response) {
-                            if (response.message) {
-                                frappe.msgprint(response.message);
+                            if (response.message && response.message.status !== "covered") {
+                                erpnext_biotime.track_sync_progress(response.message.sync_id, __("Syncing BioTime Transactions"));
                             }
                         }
                     });
@@ -64,5 +70,40 @@ frappe.listview_settings['BioTime Device'] = {
 
             dialog.show();
         });
+
+        listview.page.add_inner_button(__('Import Transactions File'), function() {
+            let dialog = new frappe.ui.Dialog({
+                title: __("Import BioTime Export"),
+                fields: [
+                    {
+                        label: __("CSV / XLSX File"),
+                        fieldname: "file_url",
+                        fieldtype: "Attach",
+                        reqd: 1
+                    },
+                    {
+                        label: __("BioTime Connector"),
+                        fieldname: "connector",
+                        fieldtype: "Link",
+                        options: "BioTime Connector",
+                        description: __("Portal the file was exported from")
+                    }
+                ],
+                primary_action_label: __("Import"),
+                primary_action: function(data) {
+                    frappe.call({
+                        method: 'erpnext_biotime.biotime_integration.file_import.enqueue_transactions_file_import',
+                        args: {
+                            file_url: data.file_url,
+                            connector: data.connector || null
+                        }
+                    });
+
+                    dialog.hide();
+                }
+            });
+
+            dialog.show();
+        });
     }
 };
@@ -0,0 +1,110 @@
+# Copyright (c) 2025, Axentor and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import get_datetime
+
+from erpnext_biotime.biotime_integration.sync_registry import (
+	REGISTRY_KEY,
+	get_entry,
+	request_sync,
+	update_entry,
+)
+
+DEVICE = "Portal A-1"
+
+
+class TestSyncRegistry(FrappeTestCase):
+	def setUp(self):
+		frappe.cache().delete_value(REGISTRY_KEY)
+		enqueue = patch.object(frappe, "enqueue")
+		self.enqueue = enqueue.start()
+		self.addCleanup(enqueue.stop)
+
+	def tearDown(self):
+		frappe.cache().delete_value(REGISTRY_KEY)
+
+	def finish(self, sync_id):
+		# Started after its range ended, so it covers all of it
+		update_entry(sync_id, status="finished", started_at="2026-01-06 00:00:00", finished_at=frappe.utils.now_datetime())
+
+	def test_new_request_is_queued(self):
+		result = request_sync("2026-01-01 00:00:00", "2026-01-02 00:00:00", device=DEVICE)
+
+		self.assertEqual(result.status, "queued")
+		self.assertEqual(get_entry(result.sync_id).status, "queued")
+		self.enqueue.assert_called_once()
+
+	def test_request_inside_a_queued_sync_is_covered(self):
+		queued = request_sync("2026-01-01 00:00:00", "2026-01-03 00:00:00", device=DEVICE)
+		result = request_sync("2026-01-01 12:00:00", "2026-01-02 00:00:00", device=DEVICE)
+
+		self.assertEqual(result, frappe._dict(sync_id=queued.sync_id, status="covered"))
+		self.enqueue.assert_called_once()
+
+	def test_sync_of_all_devices_covers_one_device(self):
+		queued = request_sync("2026-01-01 00:00:00", "2026-01-03 00:00:00")
+		result = request_sync("2026-01-01 00:00:00", "2026-01-02 00:00:00", device=DEVICE)
+
+		self.assertEqual(result, frappe._dict(sync_id=queued.sync_id, status="covered"))
+
+	def test_overlapping_request_widens_the_queued_sync(self):
+		queued = request_sync("2026-01-01 00:00:00", "2026-01-02 00:00:00", device=DEVICE)
+		result = request_sync("2026-01-01 12:00:00", "2026-01-03 00:00:00", device=DEVICE)
+
+		self.assertEqual(result, frappe._dict(sync_id=queued.sync_id, status="merged"))
+		entry = get_entry(queued.sync_id)
+		self.assertEqual(get_datetime(entry.start), get_datetime("2026-01-01 00:00:00"))
+		self.assertEqual(get_datetime(entry.end), get_datetime("2026-01-03 00:00:00"))
+
+	def test_request_is_trimmed_to_what_a_finished_sync_left_out(self):
+		finished = request_sync("2026-01-01 00:00:00", "2026-01-02 00:00:00", device=DEVICE)
+		self.finish(finished.sync_id)
+
+		result = request_sync("2026-01-01 12:00:00", "2026-01-03 00:00:00", device=DEVICE)
+
+		self.assertEqual(result.status, "queued")
+		entry = get_entry(result.sync_id)
+		self.assertEqual(get_datetime(entry.start), get_datetime("2026-01-02 00:00:00"))
+		self.assertEqual(get_datetime(entry.end), get_datetime("2026-01-03 00:00:00"))
+
+	def test_other_device_is_not_covered(self):
+		request_sync("2026-01-01 00:00:00", "2026-01-03 00:00:00", device=DEVICE)
+		result = request_sync("2026-01-01 00:00:00", "2026-01-02 00:00:00", device="Portal B-1")
+
+		self.assertEqual(result.status, "queued")
+
+	def test_replay_of_a_finished_replay_runs_again(self):
+		finished = request_sync("2026-01-01 00:00:00", "2026-01-02 00:00:00", device=DEVICE, replay=1)
+		self.finish(finished.sync_id)
+
+		result = request_sync("2026-01-01 00:00:00", "2026-01-02 00:00:00", device=DEVICE, replay=1)
+
+		self.assertEqual(result.status, "queued")
+		self.assertNotEqual(result.sync_id, finished.sync_id)
+
+	def test_replay_keeps_its_exact_range(self):
+		queued = request_sync("2026-01-01 00:00:00", "2026-01-02 00:00:00", device=DEVICE, replay=1)
+		result = request_sync("2026-01-01 12:00:00", "2026-01-03 00:00:00", device=DEVICE, replay=1)
+
+		self.assertEqual(result.status, "queued")
+		entry = get_entry(result.sync_id)
+		self.assertEqual(get_datetime(entry.start), get_datetime("2026-01-01 12:00:00"))
+		self.assertEqual(get_datetime(entry.end), get_datetime("2026-01-03 00:00:00"))
+		self.assertEqual(get_datetime(get_entry(queued.sync_id).end), get_datetime("2026-01-02 00:00:00"))
+
+	def test_replay_and_live_syncs_do_not_cover_each_other(self):
+		request_sync("2026-01-01 00:00:00", "2026-01-03 00:00:00", device=DEVICE)
+		result = request_sync("2026-01-01 00:00:00", "2026-01-02 00:00:00", device=DEVICE, replay=1)
+
+		self.assertEqual(result.status, "queued")
+
+	def test_failed_enqueue_unregisters_the_sync(self):
+		self.enqueue.side_effect = Exception("Redis queue unavailable")
+
+		with self.assertRaises(Exception):
+			request_sync("2026-01-01 00:00:00", "2026-01-02 00:00:00", device=DEVICE)
+		self.assertFalse(frappe.cache().hgetall(REGISTRY_KEY))
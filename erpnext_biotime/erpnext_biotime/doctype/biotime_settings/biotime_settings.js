@@ -1,8 +1,127 @@
 // Copyright (c) 2025, Axentor and contributors
 // For license information, please see license.txt
 
-// frappe.ui.form.on("BioTime Settings", {
-// 	refresh(frm) {
+frappe.ui.form.on("BioTime Settings", {
+	refresh(frm) {
+		frm.trigger("add_retention_buttons");
+		frm.trigger("add_reconciliation_buttons");
+		frm.trigger("add_partitioning_button");
+	},
+	add_partitioning_button(frm) {
+		if (!frm.doc.enable_time_partitioning) return;
 
-// 	},
-// });
+		frm.add_custom_button(__("Partition Tables"), function () {
+			frappe.confirm(
+				__("Rebuild Employee Checkin and BioTime Checkins as monthly partitioned tables? This can take a long time on large tables."),
+				() =>
+					frappe.call({
+						method: "erpnext_biotime.biotime_integration.partitioning.enqueue_partition_tables",
+					})
+			);
+		});
+	},
+	add_retention_buttons(frm) {
+		if (!frm.doc.enable_data_retention) return;
+
+		frm.add_custom_button(__("Archive Now"), function () {
+			frappe.call({
+				method: "erpnext_biotime.biotime_integration.retention.enqueue_retention_run",
+			});
+		}, __("Retention"));
+		frm.add_custom_button(__("Restore Archive"), function () {
+			let dialog = new frappe.ui.Dialog({
+				title: __("Restore BioTime Checkins"),
+				fields: [
+					{
+						label: __("Archive File"),
+						fieldname: "file_name",
+						fieldtype: "Link",
+						options: "File",
+						reqd: 1,
+						get_query: () => ({
+							filters: {
+								attached_to_doctype: "BioTime Settings",
+								file_name: ["like", "%.jsonl.gz"],
+							},
+						}),
+					},
+				],
+				primary_action_label: __("Restore"),
+				primary_action(values) {
+					frappe.call({
+						method: "erpnext_biotime.biotime_integration.retention.restore_biotime_checkins_archive",
+						args: { file_name: values.file_name },
+						freeze: true,
+					});
+					dialog.hide();
+				},
+			});
+			dialog.show();
+		}, __("Retention"));
+	},
+	add_reconciliation_buttons(frm) {
+		frm.add_custom_button(__("Run Audit"), function () {
+			let dialog = new frappe.ui.Dialog({
+				title: __("Reconcile Punch Counts"),
+				fields: [
+					{
+						label: __("From Date"),
+						fieldname: "from_date",
+						fieldtype: "Date",
+						reqd: 1,
+						default: frappe.datetime.add_days(frappe.datetime.get_today(), -1),
+					},
+					{
+						label: __("To Date"),
+						fieldname: "to_date",
+						fieldtype: "Date",
+						reqd: 1,
+						default: frappe.datetime.add_days(frappe.datetime.get_today(), -1),
+					},
+					{
+						label: __("Resync Mismatches"),
+						fieldname: "resync",
+						fieldtype: "Check",
+					},
+				],
+				primary_action_label: __("Run"),
+				primary_action(values) {
+					frappe.call({
+						method: "erpnext_biotime.biotime_integration.reconciliation.run_reconciliation_audit",
+						args: values,
+						freeze: true,
+						callback: (r) => frm.events.show_reconciliation_report(r.message || []),
+					});
+					dialog.hide();
+				},
+			});
+			dialog.show();
+		}, __("Reconciliation"));
+		frm.add_custom_button(__("Last Audit"), function () {
+			frappe.call({
+				method: "erpnext_biotime.biotime_integration.reconciliation.get_last_reconciliation_report",
+				callback: (r) => frm.events.show_reconciliation_report((r.message && r.message.mismatches) || []),
+			});
+		}, __("Reconciliation"));
+	},
+	show_reconciliation_report(mismatches) {
+		if (!mismatches.length) {
+			frappe.msgprint(__("Portal and ERPNext punch counts match."));
+			return;
+		}
+		let rows = mismatches
+			.map(
+				(m) => `<tr><td>${frappe.utils.escape_html(m.device_alias)}</td><td>${m.date}</td>
+					<td>${m.portal_count}</td><td>${m.erpnext_count}</td><td>${m.sync_id || ""}</td></tr>`
+			)
+			.join("");
+		frappe.msgprint({
+			title: __("Mismatched Device Days"),
+			wide: true,
+			message: `<table class="table table-bordered">
+				<thead><tr><th>${__("Device")}</th><th>${__("Date")}</th><th>${__("Portal")}</th>
+				<th>${__("ERPNext")}</th><th>${__("Resync")}</th></tr></thead>
+				<tbody>${rows}</tbody></table>`,
+		});
+	},
+});
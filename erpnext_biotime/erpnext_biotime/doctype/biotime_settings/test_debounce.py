@@ -0,0 +1,84 @@
+# Copyright (c) 2025, Axentor and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_biotime.biotime_integration.transactions import (
+	BioTimeTransaction,
+	collapse_burst,
+	debounce_transactions,
+)
+
+
+def punch(time, log_type, employee="EMP-0001", connector="Portal A", code=None):
+	return BioTimeTransaction(
+		employee=employee,
+		biotime_employee_code=code,
+		log_type=log_type,
+		time=time,
+		biotime_connector=connector,
+	)
+
+
+def summary(records):
+	return [(record.employee or record.biotime_employee_code, record.log_type, str(record.time)) for record in records]
+
+
+class TestDebounce(FrappeTestCase):
+	def test_no_window_keeps_everything(self):
+		records = [punch("2026-01-05 08:00:00", "IN"), punch("2026-01-05 08:00:05", "IN")]
+		kept, stats = debounce_transactions(records, 0)
+
+		self.assertEqual(kept, records)
+		self.assertEqual(stats, {"received": 2, "kept": 2, "collapsed": 0})
+
+	def test_burst_keeps_first_in_and_last_out(self):
+		records = [
+			punch("2026-01-05 08:00:10", "OUT"),
+			punch("2026-01-05 08:00:00", "IN"),
+			punch("2026-01-05 08:00:20", "IN"),
+			punch("2026-01-05 08:00:30", "OUT"),
+		]
+		kept, stats = debounce_transactions(records, 60)
+
+		self.assertEqual(
+			summary(kept),
+			[("EMP-0001", "IN", "2026-01-05 08:00:00"), ("EMP-0001", "OUT", "2026-01-05 08:00:30")],
+		)
+		self.assertEqual(stats, {"received": 4, "kept": 2, "collapsed": 2})
+
+	def test_burst_is_measured_from_its_first_punch(self):
+		# 08:00:50 is within 60s of 08:00:00, 08:01:10 is not, though it is within 60s of 08:00:50
+		records = [
+			punch("2026-01-05 08:00:00", "IN"),
+			punch("2026-01-05 08:00:50", "IN"),
+			punch("2026-01-05 08:01:10", "IN"),
+		]
+		kept, _stats = debounce_transactions(records, 60)
+
+		self.assertEqual(
+			summary(kept),
+			[("EMP-0001", "IN", "2026-01-05 08:00:00"), ("EMP-0001", "IN", "2026-01-05 08:01:10")],
+		)
+
+	def test_people_and_portals_are_not_merged(self):
+		records = [
+			punch("2026-01-05 08:00:00", "IN", employee="EMP-0001"),
+			punch("2026-01-05 08:00:05", "IN", employee="EMP-0002"),
+			punch("2026-01-05 08:00:00", "IN", employee=None, code="42", connector="Portal A"),
+			punch("2026-01-05 08:00:05", "IN", employee=None, code="42", connector="Portal B"),
+		]
+		kept, stats = debounce_transactions(records, 60)
+
+		self.assertEqual(len(kept), 4)
+		self.assertEqual(stats["collapsed"], 0)
+
+	def test_collapse_burst(self):
+		only_in = [punch("2026-01-05 08:00:00", "IN"), punch("2026-01-05 08:00:05", "IN")]
+		self.assertEqual(collapse_burst(only_in), only_in[:1])
+
+		only_out = [punch("2026-01-05 17:00:00", "OUT"), punch("2026-01-05 17:00:05", "OUT")]
+		self.assertEqual(collapse_burst(only_out), only_out[1:])
+
+		single = [punch("2026-01-05 08:00:00", "OUT")]
+		self.assertEqual(collapse_burst(single), single)
@@ -0,0 +1,118 @@
+# Copyright (c) 2025, Axentor and Contributors
+# See license.txt
+
+from datetime import timedelta
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import get_datetime, getdate
+
+from erpnext_biotime.biotime_integration.shift_resolver import ShiftResolver
+
+SHIFT_TYPES = {
+	"Day": frappe._dict(
+		name="Day",
+		start_time=timedelta(hours=8),
+		end_time=timedelta(hours=17),
+		begin_check_in_before_shift_start_time=60,
+		allow_check_out_after_shift_end_time=60,
+		holiday_list=None,
+	),
+	"Night": frappe._dict(
+		name="Night",
+		start_time=timedelta(hours=22),
+		end_time=timedelta(hours=6),
+		begin_check_in_before_shift_start_time=60,
+		allow_check_out_after_shift_end_time=120,
+		holiday_list=None,
+	),
+	"Late": frappe._dict(
+		name="Late",
+		start_time=timedelta(hours=12),
+		end_time=timedelta(hours=21),
+		begin_check_in_before_shift_start_time=60,
+		allow_check_out_after_shift_end_time=60,
+		holiday_list=None,
+	),
+}
+
+
+def make_resolver(default_shift="Day", status="Active", assignments=(), holidays=()):
+	"""A resolver loaded from the given rows instead of the database."""
+	resolver = ShiftResolver([])
+	resolver.employees["EMP-0001"] = frappe._dict(
+		name="EMP-0001", status=status, default_shift=default_shift, holiday_list="Holidays", company=None
+	)
+	for shift_type, start_date, end_date in assignments:
+		resolver.assignments["EMP-0001"].append(
+			frappe._dict(employee="EMP-0001", shift_type=shift_type, start_date=start_date, end_date=end_date)
+		)
+	resolver.holidays = {("Holidays", getdate(day)) for day in holidays}
+	return resolver
+
+
+def checkin(time):
+	return {"employee": "EMP-0001", "time": time}
+
+
+@patch(
+	"erpnext_biotime.biotime_integration.shift_resolver.get_shift_type",
+	new=lambda shift_type: SHIFT_TYPES[shift_type],
+)
+class TestShiftResolver(FrappeTestCase):
+	def test_day_window(self):
+		window = make_resolver().get_window(SHIFT_TYPES["Day"], getdate("2026-01-05"))
+
+		self.assertEqual(window.shift, "Day")
+		self.assertEqual(window.shift_start, get_datetime("2026-01-05 08:00:00"))
+		self.assertEqual(window.shift_end, get_datetime("2026-01-05 17:00:00"))
+		self.assertEqual(window.shift_actual_start, get_datetime("2026-01-05 07:00:00"))
+		self.assertEqual(window.shift_actual_end, get_datetime("2026-01-05 18:00:00"))
+
+	def test_overnight_window_ends_the_next_day(self):
+		window = make_resolver().get_window(SHIFT_TYPES["Night"], getdate("2026-01-05"))
+
+		self.assertEqual(window.shift_start, get_datetime("2026-01-05 22:00:00"))
+		self.assertEqual(window.shift_end, get_datetime("2026-01-06 06:00:00"))
+		self.assertEqual(window.shift_actual_end, get_datetime("2026-01-06 08:00:00"))
+
+	def test_resolves_the_default_shift(self):
+		window = make_resolver().resolve(checkin("2026-01-05 07:30:00"))
+
+		self.assertEqual(window.shift, "Day")
+		self.assertEqual(window.shift_start, get_datetime("2026-01-05 08:00:00"))
+
+	def test_overnight_punch_after_midnight_belongs_to_the_previous_day(self):
+		resolver = make_resolver(default_shift="Night")
+
+		evening = resolver.resolve(checkin("2026-01-05 21:30:00"))
+		morning = resolver.resolve(checkin("2026-01-06 07:00:00"))
+
+		self.assertEqual(evening.shift_start, get_datetime("2026-01-05 22:00:00"))
+		self.assertEqual(morning.shift_start, get_datetime("2026-01-05 22:00:00"))
+
+	def test_assignment_replaces_the_default_shift(self):
+		resolver = make_resolver(assignments=[("Night", "2026-01-05", "2026-01-05")])
+
+		self.assertEqual(resolver.resolve(checkin("2026-01-05 23:00:00")).shift, "Night")
+		self.assertEqual(resolver.resolve(checkin("2026-01-06 08:30:00")).shift, "Day")
+
+	def test_overlapping_windows_are_left_to_hrms(self):
+		# 13:00 lies in both the Day and the Late window
+		resolver = make_resolver(assignments=[("Day", "2026-01-01", None), ("Late", "2026-01-01", None)])
+
+		self.assertIsNone(resolver.resolve(checkin("2026-01-05 13:00:00")))
+		self.assertEqual(resolver.resolve(checkin("2026-01-05 07:30:00")).shift, "Day")
+
+	def test_punch_outside_every_window_is_left_to_hrms(self):
+		self.assertIsNone(make_resolver().resolve(checkin("2026-01-05 03:00:00")))
+
+	def test_holiday_is_left_to_hrms(self):
+		resolver = make_resolver(holidays=["2026-01-05"])
+
+		self.assertIsNone(resolver.resolve(checkin("2026-01-05 08:30:00")))
+
+	def test_inactive_or_unknown_employee_is_left_to_hrms(self):
+		self.assertIsNone(make_resolver(status="Left").resolve(checkin("2026-01-05 08:30:00")))
+		self.assertIsNone(make_resolver().resolve({"employee": "EMP-9999", "time": "2026-01-05 08:30:00"}))
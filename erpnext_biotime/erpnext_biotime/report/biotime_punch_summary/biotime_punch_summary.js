@@ -0,0 +1,40 @@
+// Copyright (c) 2026, Axentor and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["BioTime Punch Summary"] = {
+	filters: [
+		{
+			fieldname: "from_date",
+			label: __("From Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.add_days(frappe.datetime.get_today(), -7),
+			reqd: 1,
+		},
+		{
+			fieldname: "to_date",
+			label: __("To Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.get_today(),
+			reqd: 1,
+		},
+		{
+			fieldname: "employee",
+			label: __("Employee"),
+			fieldtype: "Link",
+			options: "Employee",
+		},
+	],
+	onload(report) {
+		report.page.add_inner_button(__("Rebuild Summary"), function () {
+			let filters = report.get_values();
+			frappe.confirm(
+				__("Recompute the summary from {0} to {1} from Employee Checkin?", [filters.from_date, filters.to_date]),
+				() =>
+					frappe.call({
+						method: "erpnext_biotime.biotime_integration.punch_summary.enqueue_summary_rebuild",
+						args: { from_date: filters.from_date, to_date: filters.to_date },
+					})
+			);
+		});
+	},
+};
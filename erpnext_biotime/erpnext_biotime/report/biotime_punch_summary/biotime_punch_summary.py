@@ -0,0 +1,41 @@
+# Copyright (c) 2026, Axentor and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import time_diff_in_hours
+
+
+def execute(filters=None):
+	"""First in, last out and punch counts per employee and day, read from BioTime Daily Punch Summary."""
+	filters = frappe._dict(filters or {})
+	return get_columns(), get_data(filters)
+
+
+def get_columns():
+	return [
+		{"label": "Employee", "fieldname": "employee", "fieldtype": "Link", "options": "Employee", "width": 140},
+		{"label": "Employee Name", "fieldname": "employee_name", "fieldtype": "Data", "width": 180},
+		{"label": "Date", "fieldname": "date", "fieldtype": "Date", "width": 100},
+		{"label": "First In", "fieldname": "first_in", "fieldtype": "Datetime", "width": 160},
+		{"label": "Last Out", "fieldname": "last_out", "fieldtype": "Datetime", "width": 160},
+		{"label": "Hours", "fieldname": "hours", "fieldtype": "Float", "precision": 2, "width": 80},
+		{"label": "Punches", "fieldname": "punch_count", "fieldtype": "Int", "width": 80},
+		{"label": "Devices", "fieldname": "devices", "fieldtype": "Data", "width": 200},
+	]
+
+
+def get_data(filters):
+	conditions = {"date": ["between", [filters.from_date, filters.to_date]]}
+	if filters.employee:
+		conditions["employee"] = filters.employee
+
+	rows = frappe.get_all(
+		"BioTime Daily Punch Summary",
+		filters=conditions,
+		fields=["employee", "employee_name", "date", "first_in", "last_out", "punch_count", "devices"],
+		order_by="date desc, employee",
+	)
+	for row in rows:
+		if row.first_in and row.last_out and row.last_out > row.first_in:
+			row.hours = time_diff_in_hours(row.last_out, row.first_in)
+	return rows
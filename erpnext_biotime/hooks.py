@@ -11,6 +11,7 @@ app_license = "MIT"
 # include js, css files in header of desk.html
 # app_include_css = "/assets/erpnext_biotime/css/erpnext_biotime.css"
 # app_include_js = "/assets/erpnext_biotime/js/erpnext_biotime.js"
+app_include_js = "biotime_sync_progress.bundle.js"
 
 # include js, css files in header of web template
 # web_include_css = "/assets/erpnext_biotime/css/erpnext_biotime.css"
@@ -102,7 +103,13 @@ app_license = "MIT"
 doc_events = {
 	"Employee Checkin": {
 		"on_update": "erpnext_biotime.overrides.employee_checkin.on_update"
-	}
+	},
+	"Shift Type": {
+		"on_update": "erpnext_biotime.biotime_integration.cache.clear_request_cached_doc"
+	},
+	"BioTime Settings": {
+		"on_update": "erpnext_biotime.biotime_integration.cache.clear_request_cached_doc"
+	},
 }
 
 # Scheduled Tasks
@@ -112,9 +119,14 @@ scheduler_events = {
     "all": [],
     "daily": [
         "erpnext_biotime.biotime_integration.biotime_integration.update_last_synced_checkin",
+        "erpnext_biotime.biotime_integration.retention.apply_retention_policy",
+        "erpnext_biotime.biotime_integration.page_cache.evict_page_cache",
+        "erpnext_biotime.biotime_integration.reconciliation.run_daily_reconciliation",
+        "erpnext_biotime.biotime_integration.partitioning.maintain_partitions",
     ],
     "hourly": [
         "erpnext_biotime.biotime_integration.biotime_integration.sync_devices_with_pagination",
+        "erpnext_biotime.overrides.employee_checkin.process_late_punch_windows",
     ],
     "weekly": [],
     "monthly": [],
@@ -151,12 +163,12 @@ scheduler_events = {
 # Request Events
 # ----------------
 # before_request = ["erpnext_biotime.utils.before_request"]
-# after_request = ["erpnext_biotime.utils.after_request"]
+after_request = ["erpnext_biotime.biotime_integration.replica.close_replica"]
 
 # Job Events
 # ----------
 # before_job = ["erpnext_biotime.utils.before_job"]
-# after_job = ["erpnext_biotime.utils.after_job"]
+after_job = ["erpnext_biotime.biotime_integration.replica.close_replica"]
 
 # User Data Protection
 # --------------------
@@ -3,30 +3,56 @@
 # For license information, please see license.txt
 
 from __future__ import unicode_literals
+import json
 import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import cint, get_datetime
 from datetime import datetime, timedelta
 from itertools import groupby
+from redis.exceptions import LockError
 
 # from hrms.hr.doctype.attendance.attendance import mark_attendance
 # from hrms.hr.doctype.employee_checkin.employee_checkin import EmployeeCheckin as BaseEmployeeCheckin
 from hrms.hr.doctype.employee_checkin.employee_checkin import handle_attendance_exception
+from erpnext_biotime.biotime_integration.cache import get_biotime_settings, get_shift_type
+from erpnext_biotime.biotime_integration.replica import read_replica
+
+logger = frappe.logger("biotime", allow_site=True, file_count=50)
+
+# Seconds an attendance lock is held at most, and waited for at most
+ATTENDANCE_LOCK_TIMEOUT = 30
+# Redis set of shift windows that received punches after HRMS processed them
+LATE_PUNCH_WINDOWS_KEY = "biotime:late_punch_windows"
+# Windows recomputed per hourly run at most; the rest wait for the next run
+LATE_PUNCH_BATCH_SIZE = 5000
 
 def on_update(doc, event):
-	if not cint(frappe.get_value("BioTime Settings", "BioTime Settings", "autoupdate_attendance")) or not doc.get('shift'):
+	if not doc.get('shift'):
+		return
+	settings = get_biotime_settings()
+	if not cint(settings.autoupdate_attendance):
+		if cint(settings.recompute_late_punches):
+			queue_late_punch_window(doc)
+		return
+	if doc.flags.skip_attendance_update:
+		# Recomputed once per shift window by the caller, see recompute_employee_attendance
 		return
 
 	shift_name = doc.shift
-	shift_doc = frappe.get_doc("Shift Type", shift_name)
+	shift_doc = get_shift_type(shift_name)
 	create_or_update_attendance_for_employee_checkin(doc, shift_doc)
 
 def create_or_update_attendance_for_employee_checkin(checkin, shift_doc):
 	"""Creates or Updates Attendance for the given Employee Checkin based on the Shift Type.
 	:param doc: The Employee Checkin Document.
 	:param shift_doc: The Shift Type Document.
+
+	Concurrent marking of the same Attendance is serialized by the callers, which
+	run it under `attendance_lock` until their commit, see run_with_attendance_lock.
 	"""
+	attendance_date = checkin.shift_start.date()
+
 	# Fetch all logs for the employee on the attendance date and shift
 	logs = frappe.get_all(
 		"Employee Checkin",
@@ -49,8 +75,6 @@ def create_or_update_attendance_for_employee_checkin(checkin, shift_doc):
 		order_by="time",
 	)
 
-	attendance_date = checkin.shift_start.date()
-
 	attendance_status, total_working_hours, late_entry, early_exit, in_time, out_time = shift_doc.get_attendance(logs)
 	mark_attendance_and_link_log(
 		logs,
@@ -64,7 +88,146 @@ def create_or_update_attendance_for_employee_checkin(checkin, shift_doc):
 		shift=checkin.shift,
 	)
 
+def recompute_employee_attendance(employee, from_time, to_time) -> int:
+	"""Re-marks Attendance once for every shift window the employee has checkins in
+	between `from_time` and `to_time`, instead of once per checkin, committing each
+	window under its attendance lock. Returns the number of windows recomputed.
+	"""
+	if not cint(get_biotime_settings().autoupdate_attendance):
+		return 0
+
+	windows = frappe.get_all(
+		"Employee Checkin",
+		filters={
+			"employee": employee,
+			"time": ["between", [from_time, to_time]],
+			"shift": ["is", "set"],
+			"offshift": 0,
+		},
+		fields=["shift", "shift_start", "shift_actual_start"],
+		distinct=True,
+	)
+	recomputed = 0
+	for window in windows:
+		window.employee = employee
+		if recompute_attendance_window(window):
+			recomputed += 1
+		else:
+			frappe.log_error(
+				message=f"Attendance of {employee} for the {window.shift} shift starting {window.shift_start} was not recomputed; resync the employee to retry.",
+				title=f"Attendance recompute skipped for {employee}",
+			)
+	return recomputed
+
+def recompute_attendance_window(window) -> bool:
+	"""Re-marks and commits Attendance for one (employee, shift, shift_actual_start) window.
+	Returns False when it was skipped, see run_with_attendance_lock.
+	"""
+	window.shift_start = get_datetime(window.shift_start)
+	return run_with_attendance_lock(
+		window.employee,
+		window.shift_start.date(),
+		create_or_update_attendance_for_employee_checkin,
+		window,
+		get_shift_type(window.shift),
+	)
+
+def queue_late_punch_window(checkin):
+	"""Queues the checkin's shift window for recomputation when HRMS has already
+	processed it, i.e. the window ended before the shift's `last_sync_of_checkin`.
+	"""
+	shift_doc = get_shift_type(checkin.shift)
+	if not (shift_doc.last_sync_of_checkin and checkin.shift_actual_end and checkin.shift_start):
+		return
+	if get_datetime(checkin.shift_actual_end) >= get_datetime(shift_doc.last_sync_of_checkin):
+		# HRMS marks this window on its next auto attendance run
+		return
+	if shift_doc.process_attendance_after and get_datetime(checkin.shift_start).date() < get_datetime(shift_doc.process_attendance_after).date():
+		return
+
+	window = {
+		"employee": checkin.employee,
+		"shift": checkin.shift,
+		"shift_start": checkin.shift_start,
+		"shift_actual_start": checkin.shift_actual_start,
+	}
+	frappe.cache().sadd(LATE_PUNCH_WINDOWS_KEY, json.dumps(window, default=str, sort_keys=True))
+
+def process_late_punch_windows():
+	"""Recomputes the shift windows queued by late punches. Runs hourly; each window
+	is recomputed once however many late punches it received. Only while
+	"Recompute Attendance for Late Punches" is enabled in BioTime Settings.
+	"""
+	if not cint(get_biotime_settings().recompute_late_punches):
+		frappe.cache().delete_value(LATE_PUNCH_WINDOWS_KEY)
+		return
+
+	processed = 0
+	skipped = []
+	while processed < LATE_PUNCH_BATCH_SIZE:
+		value = frappe.cache().spop(LATE_PUNCH_WINDOWS_KEY)
+		if not value:
+			break
+
+		processed += 1
+		window = frappe._dict(json.loads(frappe.safe_decode(value)))
+		try:
+			if not recompute_attendance_window(window):
+				skipped.append(value)
+		except Exception as e:
+			frappe.db.rollback()
+			frappe.log_error(
+				message=str(e) + frappe.get_traceback(),
+				title=f"Late punch recompute failed for {window.employee}",
+			)
+
+	if skipped:
+		# Retried on the next run
+		frappe.cache().sadd(LATE_PUNCH_WINDOWS_KEY, *skipped)
+	if processed:
+		logger.info("Recomputed attendance for %d late punch windows", processed - len(skipped))
+
+def attendance_lock(employee, attendance_date):
+	"""Redis lock for marking one employee's Attendance on one date. Hold it until the
+	transaction commits, otherwise the next holder cannot see the rows written under it.
+	"""
+	return frappe.cache().lock(
+		frappe.cache().make_key(f"biotime:attendance:{employee}:{attendance_date}"),
+		timeout=ATTENDANCE_LOCK_TIMEOUT,
+		blocking_timeout=ATTENDANCE_LOCK_TIMEOUT,
+	)
+
+def run_with_attendance_lock(employee, attendance_date, fn, *args) -> bool:
+	"""Runs `fn(*args)` and commits while holding the attendance lock of (employee, attendance_date).
+
+	Returns False, with nothing committed, when the lock stays busy for ATTENDANCE_LOCK_TIMEOUT
+	or the transaction deadlocked; the caller decides how to retry. Any other error is raised.
+	"""
+	lock = attendance_lock(employee, attendance_date)
+	if not lock.acquire():
+		logger.error("Attendance of %s on %s is locked by another job, skipping for now", employee, attendance_date)
+		return False
+
+	try:
+		fn(*args)
+		frappe.db.commit()
+	except frappe.QueryDeadlockError:
+		# InnoDB already rolled the whole transaction back
+		frappe.db.rollback()
+		logger.error("Deadlock marking attendance of %s on %s, skipping for now", employee, attendance_date)
+		return False
+	except Exception:
+		frappe.db.rollback()
+		raise
+	finally:
+		try:
+			lock.release()
+		except LockError:
+			logger.error("Attendance lock of %s on %s expired before it was released", employee, attendance_date)
+	return True
+
 def get_employee_checkins(shift) -> list[dict]:
+	with read_replica():
 		return frappe.get_all(
 			"Employee Checkin",
 			fields=[
@@ -157,19 +320,17 @@ def mark_attendance_and_link_log(
 		frappe.throw(_("{} is an invalid Attendance Status.").format(attendance_status))
 
 def get_existing_half_day_attendance(employee, attendance_date=None):
-	attendance_name = frappe.db.exists(
+	"""Returns `{"name": ...}` of the employee's Attendance on the date, without loading the document."""
+	return frappe.db.get_value(
 		"Attendance",
 		{
 			"employee": employee,
 			"attendance_date":  attendance_date,
 		},
+		"name",
+		as_dict=True,
 	)
 
-	if attendance_name:
-		attendance_doc = frappe.get_doc("Attendance", attendance_name)
-		return attendance_doc
-	return None
-
 def update_attendance_in_checkins(log_names: list, attendance_id: str):
 	EmployeeCheckin = frappe.qb.DocType("Employee Checkin")
 	(
@@ -0,0 +1,6 @@
+import frappe
+
+
+def execute():
+    # Range scans and the (time, name) keyset export; InnoDB appends the primary key to the index
+    frappe.db.add_index("Employee Checkin", ["time"])
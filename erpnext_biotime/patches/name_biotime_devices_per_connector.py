@@ -0,0 +1,23 @@
+import frappe
+
+
+def execute():
+    """
+    BioTime Devices were named after the portal's terminal id, which is only
+    unique per connector. Rename them to `{biotime_connector}-{device_id}`,
+    assigning devices without a connector to the first enabled one.
+    """
+    default_connector = frappe.db.get_value(
+        "BioTime Connector", {"is_enabled": 1}, "name"
+    ) or frappe.db.get_value("BioTime Connector", {}, "name")
+
+    for device in frappe.get_all("BioTime Device", fields=["name", "device_id", "biotime_connector"]):
+        connector = device.biotime_connector or default_connector
+        if not connector:
+            continue
+        if not device.biotime_connector:
+            frappe.db.set_value("BioTime Device", device.name, "biotime_connector", connector, update_modified=False)
+
+        new_name = f"{connector}-{device.device_id}"
+        if device.name != new_name:
+            frappe.rename_doc("BioTime Device", device.name, new_name, force=True, show_alert=False)
@@ -0,0 +1,56 @@
+frappe.provide("erpnext_biotime");
+
+// Follow a sync job through its `biotime_sync_progress` realtime events
+erpnext_biotime.track_sync_progress = function(sync_id, title) {
+    if (!sync_id) return;
+
+    let dialog_title = title || __("BioTime Sync");
+    let handler = function(data) {
+        if (data.sync_id !== sync_id) return;
+
+        if (["finished", "cancelled", "failed"].includes(data.status)) {
+            frappe.realtime.off("biotime_sync_progress", handler);
+            frappe.hide_progress();
+            frappe.show_alert({
+                message: data.message || __("{0} {1}", [dialog_title, data.status]),
+                indicator: data.status === "finished" ? "green" : "red"
+            });
+            return;
+        }
+
+        dialog_title = data.title || dialog_title;
+        let description = [
+            data.phase === "insert" ? __("Inserting") : __("Fetching"),
+            data.total_rows
+                ? __("{0} of {1} rows", [data.rows, data.total_rows])
+                : __("{0} rows", [data.rows]),
+            __("{0} rows/s", [data.rows_per_second])
+        ];
+        if (data.total_pages) {
+            description.push(__("page {0} of {1}", [data.pages, data.total_pages]));
+        }
+        if (data.eta_seconds != null) {
+            description.push(__("about {0}s left", [data.eta_seconds]));
+        }
+
+        let dialog = frappe.show_progress(dialog_title, data.rows, data.total_rows || data.rows || 1, description.join(", "));
+        if (!dialog.biotime_cancel_set) {
+            dialog.set_primary_action(__("Cancel Sync"), function() {
+                frappe.call({
+                    method: "erpnext_biotime.biotime_integration.progress.cancel_sync",
+                    args: { sync_id: sync_id }
+                });
+            });
+            dialog.biotime_cancel_set = true;
+            dialog.onhide = function() {
+                // Closing the dialog stops following the sync, not the sync itself
+                frappe.realtime.off("biotime_sync_progress", handler);
+                dialog.biotime_cancel_set = false;
+                dialog.get_primary_btn().addClass("hide");
+            };
+        }
+        dialog.get_primary_btn().removeClass("hide");
+    };
+
+    frappe.realtime.on("biotime_sync_progress", handler);
+};